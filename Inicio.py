@@ -1,16 +1,9 @@
 import streamlit as st
-from supabase import create_client, Client
-import psycopg2
-import os
-from dotenv import load_dotenv
-import pandas as pd
-from functions import execute_query, add_user, autenticar_usuario, buscar_rol, verificar_medico_por_dni, obtener_dni_por_usuario
-from functions import get_connection, verificar_si_existe_user_con_dni, verificar_si_existe_user_name, crear_logo_centrado, crear_logo
-import plotly.express as px
-import plotly.graph_objects as go
+from functions import add_user, iniciar_sesion, guardar_sesion, verificar_medico_por_dni
+from functions import verificar_si_existe_user_con_dni, verificar_si_existe_user_name, crear_logo_centrado
+from functions import mostrar_sidebar
 import time
 #pip install streamlit plotly pandas
-load_dotenv()
 
 # Configuración de la página
 st.set_page_config(
@@ -246,53 +239,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Simulación de funciones de base de datos
-def manage_page_access():
-    # Definir permisos por rol
-    role_permissions = {
-        "Medico": ["Consultas_médicas.py", "Estudios.py", "Medicamentos.py", "Historial_clínico.py"],
-        "Admisiones": ["Administración.py"]
-    }
-    
-    # Lista de todas las páginas
-    all_pages = ["Administración.py", "Consultas_médicas.py", "Estudios.py", "Medicamentos.py", "Historial_clínico.py"]
-    
-    # Crear archivo .streamlit/config.toml si no existe
-    os.makedirs(".streamlit", exist_ok=True)
-    
-    if not st.session_state.get("logged_in", False):
-        # Si no está logueado, bloquear todas las páginas
-        with open(".streamlit/config.toml", "w") as f:
-            for page in all_pages:
-                page_name = page.replace(".py", "").replace("_", " ")
-                f.write(f'[browser.gatherUsageStats]\n')
-                f.write(f'enabled = false\n\n')
-                f.write(f'[pages]\n')
-                for p in all_pages:
-                    f.write(f'[pages.{p.replace(".py", "").replace("_", "")}]\n')
-                    f.write(f'disabled = true\n\n')
-    else:
-        # Si está logueado, permitir solo las páginas según el rol
-        rol = st.session_state.get("rol", "")
-        allowed_pages = role_permissions.get(rol, [])
-        
-        with open(".streamlit/config.toml", "w") as f:
-            f.write(f'[browser.gatherUsageStats]\n')
-            f.write(f'enabled = false\n\n')
-            f.write(f'[pages]\n')
-            for page in all_pages:
-                page_key = page.replace(".py", "").replace("_", "")
-                if page in allowed_pages:
-                    f.write(f'[pages.{page_key}]\n')
-                    f.write(f'disabled = false\n\n')
-                else:
-                    f.write(f'[pages.{page_key}]\n')
-                    f.write(f'disabled = true\n\n')
-    
-    # Notificar a Streamlit que debe recargar la configuración
-    st.rerun()
-
-
 # Inicializa estado de sesión
 if "auth_mode" not in st.session_state:
     st.session_state.auth_mode = "Login"
@@ -335,20 +281,12 @@ if not st.session_state.logged_in:
                     st.error("La contraseña debe tener 8 o más caracteres y no debe contener espacios")
                 elif username and password:
                     if username and password:
-                        resultado = autenticar_usuario(username, password)
+                        resultado = iniciar_sesion(username, password)
                         if resultado['success']:
-                            buscar_dni = obtener_dni_por_usuario(username)
-                            saber_rol = buscar_rol(username, password)
-                            if buscar_dni["success"]:
-                                dni = buscar_dni["dni"]
-                                rol = saber_rol["message"]
-                                st.session_state.logged_in = True
-                                st.session_state.username = username
-                                st.session_state.dni = dni
-                                st.session_state.rol = rol
-                                st.success("¡Inicio de sesión exitoso!")
-                                time.sleep(1)
-                                st.rerun()
+                            guardar_sesion(resultado['principal'])
+                            st.success("¡Inicio de sesión exitoso!")
+                            time.sleep(1)
+                            st.rerun()
                         else:
                             st.error(resultado['message'])
                 else:
@@ -415,31 +353,6 @@ if not st.session_state.logged_in:
 
 # Página Principal (Usuario logueado)
 if st.session_state.get("logged_in"):
-    # Sidebar con información del usuario
-    with st.sidebar:
-        crear_logo()
-        st.markdown("---")
-        st.markdown(f"👤 Usuario: {st.session_state.username}")
-        st.markdown(f"👥 Rol: {st.session_state.rol}")
-        st.markdown("---")
-        
-        # Mostrar información sobre páginas accesibles
-        if st.session_state.rol == "Médico":
-            st.success("✅ Tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-            st.error("❌ No tienes acceso a: Administración")
-        elif st.session_state.rol == "Admisiones":
-            st.success("✅ Tienes acceso a: Administración")
-            st.error("❌ No tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-        
-        st.markdown("---")
-        if st.button("🚪 Cerrar sesión"):
-            # Restablecer estado y bloquear páginas
-            st.session_state.clear()
-            try:
-                manage_page_access()
-            except:
-                pass
-            st.rerun()
     # Mensaje de bienvenida personalizado
     st.markdown(f'<div class="welcome-text">¡Bienvenido a SyncSalud, {st.session_state.username}! 👋</div>', unsafe_allow_html=True)
     if st.session_state.rol == "Médico":
@@ -669,6 +582,10 @@ if st.session_state.get("logged_in"):
     # Gráfico de mejora en la eficacia
     st.markdown("### 📊 Impacto de SyncSalud en la Eficiencia Médica")
     
+    # plotly y pandas sólo se cargan cuando hay que dibujar el gráfico
+    import pandas as pd
+    import plotly.graph_objects as go
+
     # Datos para el gráfico
     data = {
         'Métrica': ['Tiempo de consulta', 'Satisfacción del paciente', 'Precisión diagnóstica'],
@@ -756,8 +673,7 @@ else:
     # Mensaje cuando no está logueado
     st.info("👆 Por favor inicia sesión para acceder al contenido de SyncSalud.")
 
-# Spinner personalizado para procesos de carga
-def loading_animation(texto="Procesando..."):
-    with st.spinner(texto):
-        time.sleep(1)
-    return
\ No newline at end of file
+
+# Sidebar al final, así el panel de rendimiento incluye todas las consultas de la página
+if st.session_state.get("logged_in"):
+    mostrar_sidebar()
@@ -0,0 +1,145 @@
+"""
+Benchmark de arranque por página: tiempo de importación y de primer render.
+
+Cada medición corre en un intérprete nuevo para que no haya módulos ya cargados.
+Se mide cuánto tarda `import functions` (la capa compartida que importan todas
+las páginas) y cuánto tarda la primera ejecución de la página con AppTest, y se
+registra qué librerías pesadas quedaron cargadas.
+
+Uso:
+    python benchmarks/arranque.py                         # mide e imprime
+    python benchmarks/arranque.py --guardar base.json     # guarda como línea base
+    python benchmarks/arranque.py --comparar base.json    # falla si empeora más del umbral
+
+Con --offline las variables de conexión apuntan a un puerto cerrado, así las
+páginas que consultan la base fallan al instante en lugar de esperar a la red.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDICO = {"logged_in": True, "username": "bench", "rol": "Médico", "dni": "0", "id_medico": 1}
+ADMISIONES = {"logged_in": True, "username": "bench", "rol": "Admisiones", "dni": "0"}
+
+PAGINAS = {
+    "Inicio (sin sesión)": ("Inicio.py", {}),
+    "Inicio (médico)": ("Inicio.py", MEDICO),
+    "Administración": ("pages/Administración.py", ADMISIONES),
+    "Consultas médicas": ("pages/Consultas_médicas.py", MEDICO),
+    "Estudios": ("pages/Estudios.py", MEDICO),
+    "Historial": ("pages/Historial.py", MEDICO),
+    "Medicamentos": ("pages/Medicamentos.py", MEDICO),
+}
+
+MODULOS_PESADOS = ["pandas", "plotly", "supabase", "pyarrow"]
+
+# Código que corre en el intérprete hijo; recibe la página y el estado por argv.
+_HIJO = r"""
+import json, sys, time
+pagina, estado, pesados = sys.argv[1], json.loads(sys.argv[2]), json.loads(sys.argv[3])
+
+t0 = time.perf_counter()
+import functions
+t_import = time.perf_counter() - t0
+
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(pagina, default_timeout=120)
+for clave, valor in estado.items():
+    at.session_state[clave] = valor
+
+t0 = time.perf_counter()
+at.run()
+t_render = time.perf_counter() - t0
+
+print(json.dumps({
+    "import": t_import,
+    "render": t_render,
+    "excepciones": len(at.exception),
+    "cargados": [m for m in pesados if m in sys.modules],
+}))
+"""
+
+
+def medir_pagina(script, estado, offline):
+    env = dict(os.environ)
+    if offline:
+        env.update({
+            "SUPABASE_DB_HOST": "127.0.0.1",
+            "SUPABASE_DB_PORT": "9",
+            "SUPABASE_POOL_TIMEOUT": "1",
+        })
+    salida = subprocess.run(
+        [sys.executable, "-c", _HIJO, script, json.dumps(estado), json.dumps(MODULOS_PESADOS)],
+        cwd=RAIZ, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir(repeticiones, offline):
+    resultados = {}
+    for nombre, (script, estado) in PAGINAS.items():
+        muestras = [medir_pagina(script, estado, offline) for _ in range(repeticiones)]
+        resultados[nombre] = {
+            "import_s": statistics.median(m["import"] for m in muestras),
+            "render_s": statistics.median(m["render"] for m in muestras),
+            "excepciones": max(m["excepciones"] for m in muestras),
+            "cargados": muestras[-1]["cargados"],
+        }
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'Página':<22}{'import (ms)':>12}{'render (ms)':>13}  librerías cargadas")
+    for nombre, r in resultados.items():
+        cargados = ", ".join(r["cargados"]) or "-"
+        aviso = "  [excepción]" if r["excepciones"] else ""
+        print(f"{nombre:<22}{r['import_s'] * 1000:>12.1f}{r['render_s'] * 1000:>13.1f}  {cargados}{aviso}")
+
+
+def comparar(resultados, base, umbral):
+    """Devuelve la lista de métricas que empeoraron más de `umbral` (fracción)."""
+    regresiones = []
+    for nombre, r in resultados.items():
+        if nombre not in base:
+            continue
+        for metrica in ("import_s", "render_s"):
+            antes, ahora = base[nombre][metrica], r[metrica]
+            if antes > 0 and (ahora - antes) / antes > umbral:
+                regresiones.append(f"{nombre} {metrica}: {antes * 1000:.1f} ms -> {ahora * 1000:.1f} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="no intentar conectarse a la base real")
+    parser.add_argument("--guardar", metavar="ARCHIVO", help="guardar los resultados como línea base")
+    parser.add_argument("--comparar", metavar="ARCHIVO", help="comparar contra una línea base")
+    parser.add_argument("--umbral", type=float, default=0.20, help="regresión tolerada (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = medir(args.repeticiones, args.offline)
+    imprimir(resultados)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(resultados, base, args.umbral)
+        if regresiones:
+            print("\nRegresiones:")
+            for r in regresiones:
+                print(f"  {r}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
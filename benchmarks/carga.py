@@ -0,0 +1,491 @@
+"""
+Prueba de carga de las páginas: N sesiones de médicos simultáneas contra un servidor real.
+
+La prueba levanta un solo `streamlit run Inicio.py` y lo maneja por el mismo
+websocket que usa el navegador (/_stcore/stream): cada sesión es un cliente
+que manda las reejecuciones con el estado de los widgets (textos, botones,
+selecciones) y espera a que el guion termine. Como en producción, todas las
+sesiones comparten el proceso del servidor, su pool de conexiones
+(SUPABASE_POOL_MAX_SIZE) y sus cachés. Cada sesión repite el recorrido de un
+médico, con una conexión nueva (un login nuevo) por recorrido:
+
+    Inicio (login) -> Historial (buscar DNI) -> Estudios (buscar DNI)
+    -> Consultas médicas (ver historial) -> Medicamentos (buscar DNI y recetar)
+
+La concurrencia sube por escalones (--sesiones) y en cada uno se informa la
+latencia de cada reejecución por paso (p50/p95/p99), el rendimiento
+(reejecuciones y recorridos por segundo), los errores y la saturación del pool
+del servidor: el mismo proceso del servidor muestrea db_pool.pool_stats() y la
+prueba resume las muestras de la ventana del escalón (conexiones en uso,
+fracción del tiempo con el pool lleno, esperas y timeouts).
+
+Necesita una base con datos de benchmarks/generador.py (usuarios medico<n> con
+la contraseña del generador):
+
+    python benchmarks/generador.py --esquema carga --crear --escala 0.1
+    python benchmarks/carga.py --esquema carga --sesiones 1 2 4 8 16 --duracion 30
+    python benchmarks/carga.py --esquema carga --guardar carga.json
+
+El login de Inicio espera 1 s antes de reejecutar (time.sleep de la página);
+ese segundo aparece en la latencia del paso "Inicio: iniciar sesión".
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from datos import DSN_POR_DEFECTO, PERCENTILES, percentiles, variables_de_conexion, verificar_local  # noqa: E402
+from generador import CONTRASEÑA  # noqa: E402
+
+PAGINA_PRINCIPAL = "Inicio.py"
+
+# Widgets que el recorrido completa o pulsa, por tipo de elemento del protocolo
+TIPOS_DE_WIDGET = ("text_input", "text_area", "button", "multiselect", "selectbox", "radio")
+
+INTERVALO_MUESTREO_POOL = 0.05
+
+# Margen para que el servidor arranque e importe la aplicación
+ESPERA_ARRANQUE = 120
+
+
+class Medicion:
+    """Latencias y errores de todas las sesiones durante un escalón."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.recorridos = 0
+
+    def paso(self, nombre, sesion, pagina=None, boton=None):
+        """Reejecuta la página de `sesion` midiendo el tiempo hasta que el guion termina."""
+        inicio = time.perf_counter()
+        sesion.reejecutar(pagina, boton)
+        segundos = time.perf_counter() - inicio
+        with self._lock:
+            self.latencias[nombre].append(segundos)
+            for excepcion in sesion.excepciones:
+                self.errores[f"{nombre}: excepción en la página ({excepcion})"] += 1
+
+    def recorrido_completo(self):
+        with self._lock:
+            self.recorridos += 1
+
+    def error(self, descripcion, veces=1):
+        with self._lock:
+            self.errores[descripcion] += veces
+
+
+class SesionWeb:
+    """
+    Una pestaña del navegador: una sesión de Streamlit sobre su propio websocket.
+
+    Guarda el estado de los widgets como el frontend (los valores persisten
+    entre reejecuciones de la misma página; los botones valen solo para la
+    reejecución en que se pulsan) y, de cada ejecución, los widgets dibujados
+    por tipo y etiqueta y las excepciones que mostró la página.
+    """
+
+    def __init__(self, puerto, timeout):
+        from websockets.sync.client import connect
+
+        self.timeout = timeout
+        self.paginas = {}
+        self.pagina = ""
+        self.estados = {}
+        self.widgets = {}
+        self.excepciones = []
+        self._ws = connect(f"ws://127.0.0.1:{puerto}/_stcore/stream", subprotocols=["streamlit"],
+                           open_timeout=timeout, max_size=None)
+
+    def cerrar(self):
+        self._ws.close()
+
+    def _widget(self, tipo, etiqueta):
+        try:
+            return self.widgets[(tipo, etiqueta)]
+        except KeyError:
+            raise LookupError(f"No se encontró {tipo} '{etiqueta}' en la página.") from None
+
+    def hay(self, tipo, etiqueta):
+        return (tipo, etiqueta) in self.widgets
+
+    def escribir(self, etiqueta, texto, tipo="text_input"):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self._widget(tipo, etiqueta)
+        self.estados[widget.id] = WidgetState(id=widget.id, string_value=texto)
+
+    def opciones(self, etiqueta):
+        return list(self._widget("multiselect", etiqueta).options)
+
+    def elegir(self, etiqueta, opciones):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self._widget("multiselect", etiqueta)
+        estado = WidgetState(id=widget.id)
+        estado.string_array_value.data.extend(opciones)
+        self.estados[widget.id] = estado
+
+    def _hash_de_pagina(self, script):
+        nombre = "" if script == PAGINA_PRINCIPAL else os.path.splitext(os.path.basename(script))[0]
+        if nombre not in self.paginas:
+            if not nombre:
+                return ""  # Primera carga: sin hash, el servidor corre la página principal
+            raise LookupError(f"El servidor no publicó la página '{script}'.")
+        return self.paginas[nombre]
+
+    def reejecutar(self, pagina=None, boton=None):
+        """
+        Pide una reejecución y lee los mensajes del servidor hasta que el guion termina.
+
+        Args:
+            pagina (str, optional): Guion al que navegar (p. ej. "pages/Historial.py").
+                Al cambiar de página se descarta el estado de los widgets.
+            boton (str, optional): Etiqueta del botón (o del botón de un formulario)
+                que se pulsa en esta reejecución.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        mensaje = BackMsg()
+        cliente = mensaje.rerun_script
+        if pagina is not None:
+            self.estados = {}
+            cliente.page_script_hash = self._hash_de_pagina(pagina)
+        else:
+            cliente.page_script_hash = self.pagina
+        cliente.widget_states.widgets.extend(self.estados.values())
+        if boton is not None:
+            cliente.widget_states.widgets.append(
+                WidgetState(id=self._widget("button", boton).id, trigger_value=True))
+        self._ws.send(mensaje.SerializeToString())
+
+        while True:
+            recibido = ForwardMsg()
+            recibido.ParseFromString(self._ws.recv(timeout=self.timeout))
+            tipo = recibido.WhichOneof("type")
+            if tipo == "new_session":
+                # Empieza una ejecución (también tras un st.rerun de la página)
+                self.pagina = recibido.new_session.page_script_hash
+                self.widgets = {}
+                self.excepciones = []
+            elif tipo == "navigation":
+                self.paginas = {p.url_pathname: p.page_script_hash for p in recibido.navigation.app_pages}
+            elif tipo == "delta" and recibido.delta.WhichOneof("type") == "new_element":
+                elemento = recibido.delta.new_element
+                tipo_elemento = elemento.WhichOneof("type")
+                if tipo_elemento == "exception":
+                    self.excepciones.append(elemento.exception.type)
+                elif tipo_elemento in TIPOS_DE_WIDGET:
+                    widget = getattr(elemento, tipo_elemento)
+                    self.widgets[(tipo_elemento, widget.label)] = widget
+            elif tipo == "page_not_found":
+                raise LookupError("El servidor no encontró la página pedida.")
+            elif tipo == "script_finished":
+                estado = recibido.script_finished
+                if estado == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.excepciones.append("error de compilación")
+                if estado in (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR):
+                    return
+
+
+def recorrido(medicion, puerto, usuario, dni, timeout):
+    """Un médico entra, revisa a un paciente en cada página y le receta."""
+    sesion = SesionWeb(puerto, timeout)
+    try:
+        # Inicio: render inicial y login
+        medicion.paso("Inicio: primera carga", sesion, pagina=PAGINA_PRINCIPAL)
+        sesion.escribir("👤 Usuario", usuario)
+        sesion.escribir("🔑 Contraseña", CONTRASEÑA)
+        medicion.paso("Inicio: iniciar sesión", sesion, boton="Iniciar sesión")
+        if sesion.hay("text_input", "👤 Usuario"):
+            raise RuntimeError(f"No se pudo iniciar sesión como {usuario}.")
+
+        # Historial
+        medicion.paso("Historial: primera carga", sesion, pagina="pages/Historial.py")
+        sesion.escribir("🆔 Ingrese DNI del paciente", dni)
+        medicion.paso("Historial: buscar", sesion, boton="🔍 Buscar historial")
+
+        # Estudios
+        medicion.paso("Estudios: primera carga", sesion, pagina="pages/Estudios.py")
+        sesion.escribir("🆔 DNI del paciente", dni)
+        medicion.paso("Estudios: buscar", sesion, boton="🔍 Buscar estudios")
+
+        # Consultas médicas
+        medicion.paso("Consultas: primera carga", sesion, pagina="pages/Consultas_médicas.py")
+        sesion.escribir("🆔 DNI del paciente", dni)
+        medicion.paso("Consultas: buscar", sesion, boton="🔍 Buscar historial")
+
+        # Medicamentos: buscar paciente y guardar una receta de dos medicamentos
+        medicion.paso("Medicamentos: primera carga", sesion, pagina="pages/Medicamentos.py")
+        sesion.escribir("🆔 Ingrese el DNI del paciente", dni)
+        medicion.paso("Medicamentos: buscar", sesion, boton="🔍 Buscar paciente")
+        etiqueta = "Busca y selecciona medicamentos"
+        sesion.elegir(etiqueta, sesion.opciones(etiqueta)[:2])
+        sesion.escribir("Escribí las indicaciones para los medicamentos seleccionados",
+                        "1 comprimido cada 8 horas", tipo="text_area")
+        medicion.paso("Medicamentos: recetar", sesion, boton="💾 Guardar receta")
+    finally:
+        sesion.cerrar()
+
+    medicion.recorrido_completo()
+
+
+class MuestreoPool(threading.Thread):
+    """En el proceso del servidor: anota db_pool.pool_stats() en `archivo`, una línea JSON por muestra."""
+
+    def __init__(self, archivo):
+        super().__init__(daemon=True)
+        self.archivo = archivo
+
+    def run(self):
+        from db_pool import pool_stats
+
+        with open(self.archivo, "a", encoding="utf-8") as f:
+            while True:
+                f.write(json.dumps({"t": time.time(), **pool_stats()}) + "\n")
+                f.flush()
+                time.sleep(INTERVALO_MUESTREO_POOL)
+
+
+def servidor(puerto, muestras):
+    """
+    Proceso del servidor: `streamlit run Inicio.py` con el muestreo del pool.
+
+    db_pool es un módulo del proceso, así que el muestreo ve el mismo pool que
+    usan las páginas de todas las sesiones.
+    """
+    from streamlit.web import cli
+
+    MuestreoPool(muestras).start()
+    sys.argv = [
+        "streamlit", "run", os.path.join(RAIZ, PAGINA_PRINCIPAL),
+        "--server.headless", "true",
+        "--server.address", "127.0.0.1",
+        "--server.port", str(puerto),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    sys.exit(cli.main())
+
+
+def arrancar_servidor(puerto, muestras):
+    """Lanza el servidor en otro proceso y espera a que responda y a que la aplicación cargue."""
+    proceso = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--servidor",
+                                "--puerto", str(puerto), "--muestras", muestras], cwd=RAIZ)
+    limite = time.perf_counter() + ESPERA_ARRANQUE
+    while True:
+        if proceso.poll() is not None:
+            sys.exit(f"El servidor terminó al arrancar (código {proceso.returncode}).")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=1) as respuesta:
+                if respuesta.status == 200:
+                    break
+        except (urllib.error.URLError, OSError):
+            pass
+        if time.perf_counter() > limite:
+            proceso.terminate()
+            sys.exit(f"El servidor no respondió en {ESPERA_ARRANQUE} s.")
+        time.sleep(0.5)
+
+    # Una primera carga importa la capa de datos y abre el pool antes de medir
+    sesion = SesionWeb(puerto, ESPERA_ARRANQUE)
+    try:
+        sesion.reejecutar(PAGINA_PRINCIPAL)
+    finally:
+        sesion.cerrar()
+    return proceso
+
+
+def detener_servidor(proceso):
+    proceso.terminate()
+    try:
+        proceso.wait(10)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+
+
+def sesion(numero, medicion, puerto, usuarios, dnis, duracion, timeout, barrera):
+    """Un hilo cliente: espera a los demás en `barrera` y repite el recorrido durante `duracion` segundos."""
+    azar = random.Random(numero)
+    try:
+        barrera.wait(ESPERA_ARRANQUE)
+    except threading.BrokenBarrierError:
+        return
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        try:
+            recorrido(medicion, puerto, azar.choice(usuarios), azar.choice(dnis), timeout)
+        except Exception as e:
+            medicion.error(f"recorrido: {type(e).__name__}: {e}")
+
+
+def _muestras(archivo, desde, hasta):
+    with open(archivo, encoding="utf-8") as f:
+        muestras = [json.loads(linea) for linea in f if linea.strip()]
+    return [m for m in muestras if desde <= m["t"] <= hasta]
+
+
+def _espera_total(stats):
+    return stats['wait_avg'] * stats['checkouts']
+
+
+def resumen_pool(muestras):
+    """Saturación del pool del servidor durante la ventana de las muestras."""
+    if not muestras:
+        return None
+    primera, ultima = muestras[0], muestras[-1]
+    en_uso = [m['in_use'] for m in muestras]
+    max_size = ultima['max_size']
+    checkouts = ultima['checkouts'] - primera['checkouts']
+    espera = _espera_total(ultima) - _espera_total(primera)
+    return {
+        "max_size": max_size,
+        "en_uso_medio": statistics.mean(en_uso),
+        "en_uso_max": max(en_uso),
+        "fraccion_lleno": sum(1 for n in en_uso if n >= max_size) / len(en_uso),
+        "checkouts": checkouts,
+        "espera_media_ms": espera / checkouts * 1000 if checkouts else 0.0,
+        "timeouts": ultima['timeouts'] - primera['timeouts'],
+        "muestras": len(muestras),
+    }
+
+
+def escalon(sesiones, puerto, muestras, usuarios, dnis, duracion, timeout):
+    medicion = Medicion()
+    barrera = threading.Barrier(sesiones + 1)
+    hilos = [threading.Thread(target=sesion, args=(n, medicion, puerto, usuarios, dnis, duracion, timeout, barrera),
+                              daemon=True)
+             for n in range(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+
+    # Arrancan todas juntas
+    barrera.wait(ESPERA_ARRANQUE)
+    desde = time.time()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        # Un recorrido empezado al final puede pasarse de `duracion`; cada reejecución, no de `timeout`
+        hilo.join(max(0.0, inicio + duracion - time.perf_counter()) + 12 * timeout)
+    transcurrido = time.perf_counter() - inicio
+    colgadas = sum(1 for hilo in hilos if hilo.is_alive())
+    if colgadas:
+        medicion.error("sesión colgada al terminar el escalón", colgadas)
+    time.sleep(2 * INTERVALO_MUESTREO_POOL)  # Última muestra de la ventana
+    hasta = time.time()
+
+    reejecuciones = sum(len(t) for t in medicion.latencias.values())
+    return {
+        "sesiones": sesiones,
+        "segundos": transcurrido,
+        "recorridos": medicion.recorridos,
+        "recorridos_por_s": medicion.recorridos / transcurrido,
+        "reejecuciones": reejecuciones,
+        "reejecuciones_por_s": reejecuciones / transcurrido,
+        "pasos": {nombre: {**percentiles(t), "muestras": len(t)} for nombre, t in medicion.latencias.items()},
+        "errores": dict(medicion.errores),
+        # El pool único del servidor, compartido por todas las sesiones
+        "pool_servidor": resumen_pool(_muestras(muestras, desde, hasta)),
+    }
+
+
+def datos_de_prueba(dsn, esquema, cantidad):
+    """Usuarios médicos y DNI de pacientes existentes para repartir entre las sesiones."""
+    import psycopg2
+    from psycopg2 import sql
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            if esquema:
+                cursor.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(esquema)))
+            cursor.execute("SELECT nombre_usuario FROM users WHERE rol = 'Médico' ORDER BY nombre_usuario LIMIT %s",
+                           (cantidad,))
+            usuarios = [fila[0] for fila in cursor.fetchall()]
+            cursor.execute("SELECT dni_paciente FROM pacientes ORDER BY dni_paciente LIMIT %s", (cantidad,))
+            dnis = [fila[0] for fila in cursor.fetchall()]
+    finally:
+        conn.close()
+    if not usuarios or not dnis:
+        sys.exit("La base no tiene médicos o pacientes; cargala con benchmarks/generador.py.")
+    return usuarios, dnis
+
+
+def imprimir(resultado):
+    pool = resultado["pool_servidor"]
+    print(f"\n{resultado['sesiones']} sesiones: {resultado['recorridos']} recorridos "
+          f"({resultado['recorridos_por_s']:.2f}/s), {resultado['reejecuciones_por_s']:.1f} reejecuciones/s")
+    if pool is None:
+        print("  pool del servidor: sin muestras en el escalón")
+    else:
+        print(f"  pool del servidor (compartido): {pool['en_uso_medio']:.1f} en uso de media, "
+              f"máx. {pool['en_uso_max']}/{pool['max_size']}, lleno {pool['fraccion_lleno']:.0%} del tiempo, "
+              f"espera media {pool['espera_media_ms']:.1f} ms, {pool['timeouts']} timeouts")
+    columnas = "".join(f"{f'p{p} (ms)':>10}" for p in PERCENTILES)
+    print(f"  {'Paso':<32}{columnas}{'n':>6}")
+    for nombre, r in resultado["pasos"].items():
+        valores = "".join(f"{r[f'p{p}_ms']:>10.0f}" for p in PERCENTILES)
+        print(f"  {nombre:<32}{valores}{r['muestras']:>6}")
+    for error, veces in resultado["errores"].items():
+        print(f"  [error] {error} (x{veces})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=DSN_POR_DEFECTO, help="base con datos del generador")
+    parser.add_argument("--esquema", help="esquema donde están las tablas")
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="escalones de sesiones simultáneas")
+    parser.add_argument("--duracion", type=float, default=30, help="segundos por escalón")
+    parser.add_argument("--timeout", type=float, default=60, help="segundos máximos por reejecución")
+    parser.add_argument("--puerto", type=int, default=8599, help="puerto del servidor de Streamlit de la prueba")
+    parser.add_argument("--guardar", metavar="ARCHIVO", help="guardar los resultados en JSON")
+    parser.add_argument("--forzar", action="store_true", help="permitir una base que no es local")
+    # Uso interno: el proceso del servidor que lanza la prueba
+    parser.add_argument("--servidor", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--muestras", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servidor:
+        servidor(args.puerto, args.muestras)
+        return
+
+    verificar_local(args.dsn, args.forzar, "La prueba de carga guarda recetas")
+    usuarios, dnis = datos_de_prueba(args.dsn, args.esquema, 1000)
+
+    # El servidor hereda el entorno: el pool lee la conexión de las variables SUPABASE_DB_*
+    os.environ.update(variables_de_conexion(args.dsn, args.esquema))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        muestras = os.path.join(directorio, "pool.jsonl")
+        proceso = arrancar_servidor(args.puerto, muestras)
+        try:
+            resultados = []
+            for sesiones in args.sesiones:
+                resultado = escalon(sesiones, args.puerto, muestras, usuarios, dnis, args.duracion, args.timeout)
+                imprimir(resultado)
+                resultados.append(resultado)
+        finally:
+            detener_servidor(proceso)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark de materialización de resultados: fetchall() vs. RealDictCursor vs. COPY -> Arrow.
+
+Genera en el servidor N filas con tipos parecidos a los de las tablas clínicas
+(entero, texto, fecha, número, booleano y fecha y hora con zona, más un
+booleano y un entero con NULL como los de un LEFT JOIN) con generate_series, así no hace falta cargar
+datos, y mide para cada camino el tiempo hasta tener el DataFrame y el pico de
+memoria de Python (tracemalloc) más lo reservado por Arrow.
+
+Antes de medir comprueba que COPY -> Arrow devuelve los mismos valores y los
+mismos nulos que fetchall().
+
+Uso:
+    python benchmarks/columnar.py                       # 10k, 100k y 1M filas
+    python benchmarks/columnar.py --filas 10000 50000 --repeticiones 5
+
+Usa la misma configuración de conexión que la aplicación (SUPABASE_DB_*).
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import connect_to_supabase  # noqa: E402
+
+SQL = """
+    SELECT g AS id,
+           'Paciente ' || g AS nombre,
+           DATE '2000-01-01' + (g %% 9000) AS fecha,
+           (g %% 1000) / 7.0 AS valor,
+           g %% 2 = 0 AS activo,
+           CASE WHEN g %% 3 = 0 THEN NULL ELSE g %% 2 = 0 END AS confirmado,
+           CASE WHEN g %% 5 = 0 THEN NULL ELSE g %% 7 END AS gravedad,
+           TIMESTAMPTZ '2000-01-01 00:00:00+00' + g * INTERVAL '1 minute' AS registrado
+    FROM generate_series(1, %s) AS g
+"""
+
+
+def por_tuplas(conn, n):
+    import pandas as pd
+
+    with conn.cursor() as cursor:
+        cursor.execute(SQL, (n,))
+        columnas = [d[0] for d in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=columnas)
+
+
+def por_diccionarios(conn, n):
+    import pandas as pd
+    from psycopg2.extras import RealDictCursor
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(SQL, (n,))
+        return pd.DataFrame(cursor.fetchall())
+
+
+def por_arrow(conn, n):
+    from columnar import leer_dataframe
+
+    with conn.cursor() as cursor:
+        return leer_dataframe(cursor, SQL, (n,))
+
+
+CAMINOS = {
+    "fetchall + DataFrame": por_tuplas,
+    "RealDictCursor": por_diccionarios,
+    "COPY -> Arrow": por_arrow,
+}
+
+
+# numeric llega como texto por COPY -> Arrow y como Decimal por fetchall()
+NORMALIZAR = {"valor": Decimal}
+
+
+def verificar(conn, n=1000):
+    """Falla si COPY -> Arrow no devuelve lo mismo que fetchall() en todas las columnas, nulos incluidos."""
+    esperado = por_tuplas(conn, n)
+    obtenido = por_arrow(conn, n)
+    conn.rollback()
+    assert list(obtenido.columns) == list(esperado.columns), "columnas distintas"
+    for columna in esperado.columns:
+        nulos = esperado[columna].isna().tolist()
+        assert obtenido[columna].isna().tolist() == nulos, f"nulos distintos en '{columna}'"
+        normalizar = NORMALIZAR.get(columna, lambda v: v)
+        valores = [None if nulo else v for v, nulo in zip(esperado[columna], nulos)]
+        leidos = [None if nulo else normalizar(v) for v, nulo in zip(obtenido[columna], nulos)]
+        assert leidos == valores, f"valores distintos en '{columna}'"
+
+
+def medir(conn, funcion, n):
+    import pyarrow as pa
+
+    gc.collect()
+    arrow_antes = pa.total_allocated_bytes()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    df = funcion(conn, n)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow = pa.total_allocated_bytes() - arrow_antes
+    conn.rollback()
+    assert len(df) == n, f"se esperaban {n} filas y llegaron {len(df)}"
+    del df
+    return segundos, pico + max(arrow, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = connect_to_supabase()
+    if conn is None:
+        sys.exit("No se pudo conectar a la base de datos.")
+
+    try:
+        verificar(conn)
+    except AssertionError as e:
+        conn.close()
+        sys.exit(f"COPY -> Arrow no coincide con fetchall(): {e}")
+
+    print(f"{'Filas':>10}  {'Camino':<22}{'tiempo (ms)':>13}{'memoria (MB)':>14}")
+    try:
+        for n in args.filas:
+            for nombre, funcion in CAMINOS.items():
+                muestras = [medir(conn, funcion, n) for _ in range(args.repeticiones)]
+                tiempo = statistics.median(m[0] for m in muestras)
+                memoria = max(m[1] for m in muestras)
+                print(f"{n:>10}  {nombre:<22}{tiempo * 1000:>13.1f}{memoria / 2**20:>14.1f}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+-- Esquema de la base que usan functions.py y las páginas, para levantarlo en
+-- un PostgreSQL local (benchmarks, datos sintéticos, pruebas de carga).
+-- Reproduce tablas, claves y tipos tal como los esperan las consultas de
+-- queries.py; los índices de rendimiento los crean las migraciones
+-- (migraciones/, ver migrar.py).
+--
+-- Se ejecuta sobre el search_path actual, así puede cargarse en un esquema
+-- aparte (ver benchmarks/datos.py).
+
+CREATE TABLE users (
+    id              varchar(20) PRIMARY KEY,          -- DNI
+    nombre_usuario  varchar(100) NOT NULL UNIQUE,
+    contraseña      varchar(255) NOT NULL,
+    rol             varchar(30) NOT NULL
+);
+
+CREATE TABLE hospital (
+    id_hospital      serial PRIMARY KEY,
+    nombre_hospital  varchar(150) NOT NULL
+);
+
+CREATE TABLE categorias (
+    id_tipo_categoria  serial PRIMARY KEY,
+    nombre_categoria   varchar(100) NOT NULL
+);
+
+CREATE TABLE medicos (
+    id_medico     serial PRIMARY KEY,
+    nombre        varchar(150) NOT NULL,
+    licencia      varchar(50),
+    id_hospital   integer REFERENCES hospital (id_hospital),
+    id_categoria  integer REFERENCES categorias (id_tipo_categoria),
+    dni           varchar(20) NOT NULL UNIQUE
+);
+
+CREATE TABLE medico_hospital (
+    id_med_hosp  serial PRIMARY KEY,
+    id_medico    integer NOT NULL REFERENCES medicos (id_medico),
+    id_hospital  integer NOT NULL REFERENCES hospital (id_hospital)
+);
+
+CREATE TABLE pacientes (
+    dni_paciente         varchar(20) PRIMARY KEY,
+    nombre               varchar(150) NOT NULL,
+    obra_social          varchar(100),
+    fecha_nacimiento     date,
+    sexo                 varchar(10),
+    telefono             varchar(30),
+    contacto_emergencia  varchar(150),
+    grupo_sanguineo      varchar(3),
+    altura               numeric(5, 2),
+    peso                 numeric(5, 2)
+);
+
+CREATE TABLE consulta_medica (
+    id_consulta       serial PRIMARY KEY,
+    id_paciente       varchar(20) NOT NULL REFERENCES pacientes (dni_paciente),
+    id_medico         integer NOT NULL REFERENCES medicos (id_medico),
+    id_hospital       integer NOT NULL REFERENCES hospital (id_hospital),
+    id_categoria      integer NOT NULL REFERENCES categorias (id_tipo_categoria),
+    clasificacion     integer NOT NULL,
+    detalle_consulta  text,
+    fecha_consulta    date NOT NULL
+);
+
+CREATE TABLE tipo_estudio (
+    id_categoria_estudio  serial PRIMARY KEY,
+    tipo_de_estudio       varchar(100) NOT NULL
+);
+
+CREATE TABLE estudios (
+    id_estudio      serial PRIMARY KEY,
+    nombre_estudio  varchar(150) NOT NULL,
+    tipo_estudio    integer NOT NULL REFERENCES tipo_estudio (id_categoria_estudio)
+);
+
+CREATE TABLE estudios_realizados (
+    id_estudio_realizado  serial PRIMARY KEY,
+    dni_paciente          varchar(20) NOT NULL REFERENCES pacientes (dni_paciente),
+    id_medico             integer NOT NULL REFERENCES medicos (id_medico),
+    id_hospital           integer NOT NULL REFERENCES hospital (id_hospital),
+    id_categoria_estudio  integer NOT NULL REFERENCES tipo_estudio (id_categoria_estudio),
+    id_estudio            integer NOT NULL REFERENCES estudios (id_estudio),
+    fecha                 date NOT NULL,
+    observaciones         text
+);
+
+CREATE TABLE tipo_medicamento (
+    id_tipo_med          serial PRIMARY KEY,
+    tipo_de_medicamento  varchar(100) NOT NULL
+);
+
+CREATE TABLE medicamentos (
+    id_medicamento  serial PRIMARY KEY,
+    nombre          varchar(150) NOT NULL,
+    tipo            integer REFERENCES tipo_medicamento (id_tipo_med)
+);
+
+CREATE TABLE medicamento_recetado (
+    id_medicamento_recetado        serial PRIMARY KEY,
+    id_paciente                    varchar(20) NOT NULL REFERENCES pacientes (dni_paciente),
+    id_medico                      integer NOT NULL REFERENCES medicos (id_medico),
+    id_medicamento                 integer NOT NULL REFERENCES medicamentos (id_medicamento),
+    indicaciones                   text,
+    fecha_inicio_medicamento       date NOT NULL,
+    fecha_terminacion_medicamento  date
+);
@@ -0,0 +1,480 @@
+"""
+Generador de datos sintéticos para el esquema de SyncSalud.
+
+Llena todas las tablas a partir de una semilla y un factor de escala: la misma
+semilla y la misma escala producen exactamente los mismos datos. Las
+cardinalidades buscan parecerse a las reales:
+
+  - Por escala 1: 15 hospitales, 1.500 médicos (uno a cuatro hospitales cada
+    uno) y 100.000 pacientes; ~2 M de filas en total. La escala 5 ronda
+    los 10 M de filas.
+  - La gravedad de las consultas está sesgada hacia los valores bajos y la
+    demanda de médicos sigue una ley de potencias (unos pocos muy pedidos).
+  - Cada paciente tiene un médico de cabecera que atiende la mayoría de sus
+    consultas.
+  - Un 1 % de los pacientes son crónicos: cientos de consultas y recetas con
+    intervalos superpuestos; la mitad de ellos tiene miles de estudios.
+
+Las filas se generan en Python con un random.Random por tabla y se cargan con
+COPY en lotes, todo en una sola transacción: si algo falla no queda una carga
+a medias. Las claves foráneas siguen activas durante la carga, así la propia
+base comprueba la consistencia de lo generado.
+
+Uso:
+    python benchmarks/generador.py --escala 1
+    python benchmarks/generador.py --escala 5 --semilla 7                # ~10 M de filas
+    python benchmarks/generador.py --esquema carga --crear --escala 0.1  # esquema aparte, con las tablas
+    python benchmarks/generador.py --vaciar --escala 1                   # TRUNCATE previo
+
+Las tablas deben estar vacías (o usar --vaciar). Para usar los datos desde la
+aplicación con --esquema, exportar PGOPTIONS="-c search_path=<esquema>,public".
+Los índices no se crean acá: después de cargar, aplicar las migraciones
+(python migrar.py) y comprobar los planes con python migrar.py --verificar.
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import DSN_POR_DEFECTO, ESQUEMA_SQL, TABLAS, verificar_local  # noqa: E402
+from importacion import GRUPOS_SANGUINEOS, SEXOS  # noqa: E402
+
+# --- Cardinalidades por unidad de escala ---
+
+HOSPITALES_POR_ESCALA = 15
+MEDICOS_POR_ESCALA = 1_500
+PACIENTES_POR_ESCALA = 100_000
+FRACCION_CRONICOS = 0.01
+
+# Consultas, estudios y recetas por paciente: media exponencial para el común,
+# rango uniforme para los crónicos
+CONSULTAS_MEDIA, CONSULTAS_CRONICO = 6, (50, 400)
+ESTUDIOS_MEDIA, ESTUDIOS_CRONICO = 2, (1_000, 3_000)
+RECETAS_MEDIA, RECETAS_CRONICO = 3, (40, 150)
+
+# Gravedad 1..5: la mayoría de las consultas son leves
+PESOS_GRAVEDAD = (50, 25, 15, 7, 3)
+# Probabilidad de que una consulta la atienda el médico de cabecera
+PROB_CABECERA = 0.6
+# Exponente de la ley de potencias de la demanda de médicos y hospitales
+EXPONENTE_DEMANDA = 0.8
+# Años hacia atrás que abarca la historia clínica
+AÑOS_DE_HISTORIA = 15
+
+CONTRASEÑA = "syncsalud"
+LOTE_COPY = 50_000
+
+ESPECIALIDADES = (
+    "Clínica médica", "Pediatría", "Cardiología", "Traumatología", "Ginecología",
+    "Dermatología", "Neurología", "Endocrinología", "Gastroenterología", "Neumonología",
+    "Oftalmología", "Otorrinolaringología", "Urología", "Psiquiatría", "Oncología",
+    "Nefrología", "Reumatología", "Infectología", "Hematología", "Medicina general",
+)
+
+TIPOS_ESTUDIO = {
+    "Laboratorio": ("Hemograma completo", "Glucemia", "Perfil lipídico", "Hepatograma",
+                    "Función renal", "TSH", "Hemoglobina glicosilada", "Orina completa",
+                    "Ionograma", "Coagulograma"),
+    "Diagnóstico por imágenes": ("Radiografía de tórax", "Ecografía abdominal", "Tomografía de cerebro",
+                                 "Resonancia de rodilla", "Mamografía", "Densitometría ósea",
+                                 "Ecografía tiroidea"),
+    "Cardiología": ("Electrocardiograma", "Ecocardiograma", "Ergometría", "Holter de 24 horas",
+                    "MAPA"),
+    "Endoscopía": ("Videoendoscopía digestiva alta", "Videocolonoscopía"),
+    "Neurofisiología": ("Electroencefalograma", "Electromiograma"),
+    "Función respiratoria": ("Espirometría", "Polisomnografía"),
+    "Anatomía patológica": ("Biopsia", "Papanicolaou"),
+    "Oftalmología": ("Fondo de ojo", "Campo visual", "Tonometría"),
+}
+
+TIPOS_MEDICAMENTO = {
+    "Analgésico": ("Paracetamol 500 mg", "Ibuprofeno 400 mg", "Diclofenac 75 mg", "Ketorolac 10 mg"),
+    "Antibiótico": ("Amoxicilina 500 mg", "Amoxicilina + clavulánico 875 mg", "Azitromicina 500 mg",
+                    "Cefalexina 500 mg", "Ciprofloxacina 500 mg"),
+    "Antihipertensivo": ("Enalapril 10 mg", "Losartán 50 mg", "Amlodipina 5 mg", "Atenolol 50 mg"),
+    "Antidiabético": ("Metformina 850 mg", "Glibenclamida 5 mg", "Insulina NPH"),
+    "Hipolipemiante": ("Atorvastatina 20 mg", "Rosuvastatina 10 mg"),
+    "Antiácido": ("Omeprazol 20 mg", "Pantoprazol 40 mg", "Ranitidina 150 mg"),
+    "Ansiolítico": ("Clonazepam 0,5 mg", "Alprazolam 0,5 mg"),
+    "Antidepresivo": ("Sertralina 50 mg", "Escitalopram 10 mg"),
+    "Anticoagulante": ("Acenocumarol 4 mg", "Enoxaparina 40 mg"),
+    "Hormona tiroidea": ("Levotiroxina 50 mcg", "Levotiroxina 100 mcg"),
+    "Broncodilatador": ("Salbutamol aerosol", "Budesonide + formoterol"),
+    "Antialérgico": ("Loratadina 10 mg", "Cetirizina 10 mg"),
+}
+
+NOMBRES = ("Ana", "Juan", "María", "Carlos", "Lucía", "Pedro", "Sofía", "Diego", "Valentina",
+           "Martín", "Camila", "Javier", "Florencia", "Santiago", "Paula", "Matías", "Julieta",
+           "Nicolás", "Agustina", "Facundo", "Rosa", "Jorge", "Graciela", "Roberto", "Marta")
+APELLIDOS = ("García", "Pérez", "López", "Gómez", "Díaz", "Romero", "Sosa", "Álvarez", "Ruiz",
+             "Torres", "Fernández", "González", "Rodríguez", "Martínez", "Sánchez", "Benítez",
+             "Acosta", "Medina", "Herrera", "Suárez", "Aguirre", "Giménez", "Molina", "Castro")
+OBRAS_SOCIALES = ("OSDE", "Swiss Medical", "Galeno", "PAMI", "IOMA", "Medifé", "OSECAC", "Particular")
+PESOS_OBRA_SOCIAL = (15, 10, 8, 20, 15, 7, 15, 10)
+LOCALIDADES = ("Buenos Aires", "La Plata", "Córdoba", "Rosario", "Mendoza", "Mar del Plata",
+               "Tucumán", "Salta", "Neuquén", "Bahía Blanca")
+
+MOTIVOS_CONSULTA = ("Control de rutina", "Dolor abdominal", "Cefalea", "Fiebre", "Tos persistente",
+                    "Control de presión arterial", "Dolor lumbar", "Control de diabetes",
+                    "Lesión deportiva", "Mareos", "Dolor torácico", "Erupción cutánea",
+                    "Seguimiento de tratamiento", "Control postoperatorio", "Dificultad respiratoria")
+OBSERVACIONES = ("Sin hallazgos relevantes.", "Valores dentro de parámetros normales.",
+                 "Se observan alteraciones leves; repetir en 6 meses.", "Hallazgo compatible con el cuadro clínico.",
+                 "Resultado a correlacionar con la clínica.", "Se sugiere interconsulta con especialista.")
+FRECUENCIAS = ("cada 6 horas", "cada 8 horas", "cada 12 horas", "una vez al día", "antes de dormir")
+DURACIONES = (5, 7, 10, 14, 30, 60, 90, 180, 365)
+
+
+def _acumulados(pesos):
+    return list(itertools.accumulate(pesos))
+
+
+def _ley_de_potencias(n):
+    """Pesos acumulados de n elementos con demanda proporcional a 1 / rango^EXPONENTE_DEMANDA."""
+    return _acumulados(1 / (rango ** EXPONENTE_DEMANDA) for rango in range(1, n + 1))
+
+
+def _elegir(azar, acumulados):
+    """Índice 0..n-1 según pesos acumulados (como random.choices, sin armar listas)."""
+    return bisect.bisect(acumulados, azar.random() * acumulados[-1])
+
+
+class Generador:
+    """
+    Produce las filas de cada tabla, en orden de dependencias.
+
+    Cada tabla usa su propio random.Random derivado de la semilla, así
+    cambiar cómo se genera una tabla no altera las demás. Los ids se asignan
+    acá (1, 2, 3, ...) y se copian explícitamente; después se ajustan las
+    secuencias.
+    """
+
+    def __init__(self, semilla=42, escala=1.0, hasta=date(2025, 12, 31)):
+        self.semilla = semilla
+        self.hasta = hasta
+        self.desde = hasta - timedelta(days=365 * AÑOS_DE_HISTORIA)
+        self.n_hospitales = max(3, round(HOSPITALES_POR_ESCALA * escala))
+        self.n_medicos = max(10, round(MEDICOS_POR_ESCALA * escala))
+        self.n_pacientes = max(100, round(PACIENTES_POR_ESCALA * escala))
+
+        # Estado que comparten las tablas dependientes
+        self._estudios = []       # (id_estudio, id_categoria_estudio)
+        self._n_medicamentos = 0  # ids 1..n
+        self._medicos = []        # índice id_medico - 1 -> (hospitales, id_categoria)
+        self._pacientes = []      # (dni, ordinal de nacimiento, id_medico de cabecera, crónico)
+
+        azar = self._azar("dni")
+        # DNI únicos para pacientes, médicos y usuarios de admisión
+        dnis = azar.sample(range(5_000_000, 60_000_000), self.n_pacientes + self.n_medicos + self.n_hospitales)
+        self._dni_pacientes = dnis[:self.n_pacientes]
+        self._dni_medicos = dnis[self.n_pacientes:self.n_pacientes + self.n_medicos]
+        self._dni_admision = dnis[self.n_pacientes + self.n_medicos:]
+
+        self._demanda_hospitales = _ley_de_potencias(self.n_hospitales)
+        self._demanda_medicos = _ley_de_potencias(self.n_medicos)
+        self._gravedad = _acumulados(PESOS_GRAVEDAD)
+        self._obra_social = _acumulados(PESOS_OBRA_SOCIAL)
+
+    def _azar(self, tabla):
+        return random.Random(f"{self.semilla}:{tabla}")
+
+    def tablas(self):
+        """
+        Tablas en orden de carga.
+
+        Returns:
+            list of tuple: (tabla, columnas, filas, columna serial o None)
+        """
+        return [
+            ("hospital", ("id_hospital", "nombre_hospital"), self.hospitales(), "id_hospital"),
+            ("categorias", ("id_tipo_categoria", "nombre_categoria"), self.categorias(), "id_tipo_categoria"),
+            ("tipo_estudio", ("id_categoria_estudio", "tipo_de_estudio"), self.tipos_estudio(),
+             "id_categoria_estudio"),
+            ("estudios", ("id_estudio", "nombre_estudio", "tipo_estudio"), self.catalogo_estudios(), "id_estudio"),
+            ("tipo_medicamento", ("id_tipo_med", "tipo_de_medicamento"), self.tipos_medicamento(), "id_tipo_med"),
+            ("medicamentos", ("id_medicamento", "nombre", "tipo"), self.catalogo_medicamentos(), "id_medicamento"),
+            ("medicos", ("id_medico", "nombre", "licencia", "id_hospital", "id_categoria", "dni"),
+             self.medicos(), "id_medico"),
+            ("medico_hospital", ("id_med_hosp", "id_medico", "id_hospital"), self.medico_hospital(), "id_med_hosp"),
+            ("users", ("id", "nombre_usuario", "contraseña", "rol"), self.usuarios(), None),
+            ("pacientes", ("dni_paciente", "nombre", "obra_social", "fecha_nacimiento", "sexo", "telefono",
+                           "contacto_emergencia", "grupo_sanguineo", "altura", "peso"), self.pacientes(), None),
+            ("consulta_medica", ("id_consulta", "id_paciente", "id_medico", "id_hospital", "id_categoria",
+                                 "clasificacion", "detalle_consulta", "fecha_consulta"),
+             self.consultas(), "id_consulta"),
+            ("estudios_realizados", ("id_estudio_realizado", "dni_paciente", "id_medico", "id_hospital",
+                                     "id_categoria_estudio", "id_estudio", "fecha", "observaciones"),
+             self.estudios_realizados(), "id_estudio_realizado"),
+            ("medicamento_recetado", ("id_medicamento_recetado", "id_paciente", "id_medico", "id_medicamento",
+                                      "indicaciones", "fecha_inicio_medicamento", "fecha_terminacion_medicamento"),
+             self.recetas(), "id_medicamento_recetado"),
+        ]
+
+    # --- Catálogos ---
+
+    def hospitales(self):
+        azar = self._azar("hospital")
+        for id_hospital in range(1, self.n_hospitales + 1):
+            tipo = azar.choice(("Hospital General de Agudos", "Hospital", "Clínica", "Sanatorio"))
+            yield id_hospital, f"{tipo} {azar.choice(APELLIDOS)} ({azar.choice(LOCALIDADES)}) {id_hospital}"
+
+    def categorias(self):
+        for id_categoria, nombre in enumerate(ESPECIALIDADES, start=1):
+            yield id_categoria, nombre
+
+    def tipos_estudio(self):
+        for id_tipo, nombre in enumerate(TIPOS_ESTUDIO, start=1):
+            yield id_tipo, nombre
+
+    def catalogo_estudios(self):
+        id_estudio = 0
+        for id_tipo, estudios in enumerate(TIPOS_ESTUDIO.values(), start=1):
+            for nombre in estudios:
+                id_estudio += 1
+                self._estudios.append((id_estudio, id_tipo))
+                yield id_estudio, nombre, id_tipo
+
+    def tipos_medicamento(self):
+        for id_tipo, nombre in enumerate(TIPOS_MEDICAMENTO, start=1):
+            yield id_tipo, nombre
+
+    def catalogo_medicamentos(self):
+        id_medicamento = 0
+        for id_tipo, medicamentos in enumerate(TIPOS_MEDICAMENTO.values(), start=1):
+            for nombre in medicamentos:
+                id_medicamento += 1
+                yield id_medicamento, nombre, id_tipo
+        self._n_medicamentos = id_medicamento
+
+    # --- Personas ---
+
+    def _nombre(self, azar):
+        return f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}"
+
+    def medicos(self):
+        azar = self._azar("medicos")
+        for id_medico, dni in enumerate(self._dni_medicos, start=1):
+            hospitales = [1 + _elegir(azar, self._demanda_hospitales)]
+            for _ in range(azar.choice((0, 0, 1, 1, 2, 3))):
+                otro = 1 + azar.randrange(self.n_hospitales)
+                if otro not in hospitales:
+                    hospitales.append(otro)
+            id_categoria = 1 + azar.randrange(len(ESPECIALIDADES))
+            self._medicos.append((hospitales, id_categoria))
+            yield id_medico, f"Dr. {self._nombre(azar)}", f"MN-{100000 + id_medico}", hospitales[0], id_categoria, str(dni)
+
+    def medico_hospital(self):
+        ids = itertools.count(1)
+        for id_medico, (hospitales, _) in enumerate(self._medicos, start=1):
+            for id_hospital in hospitales:
+                yield next(ids), id_medico, id_hospital
+
+    def usuarios(self):
+        for id_medico, dni in enumerate(self._dni_medicos, start=1):
+            yield str(dni), f"medico{id_medico}", CONTRASEÑA, "Médico"
+        for id_hospital, dni in enumerate(self._dni_admision, start=1):
+            yield str(dni), f"admisiones{id_hospital}", CONTRASEÑA, "Admisiones"
+
+    def pacientes(self):
+        azar = self._azar("pacientes")
+        cronicos = set(azar.sample(range(self.n_pacientes), round(self.n_pacientes * FRACCION_CRONICOS)))
+        hasta = self.hasta.toordinal()
+        for i, dni in enumerate(self._dni_pacientes):
+            cronico = i in cronicos
+            # Los crónicos tienden a ser mayores
+            edad = azar.randint(40, 95) if cronico else azar.randint(0, 90)
+            nacimiento = hasta - edad * 365 - azar.randrange(365)
+            cabecera = 1 + _elegir(azar, self._demanda_medicos)
+            self._pacientes.append((str(dni), nacimiento, cabecera, cronico))
+            yield (
+                str(dni), self._nombre(azar), OBRAS_SOCIALES[_elegir(azar, self._obra_social)],
+                date.fromordinal(nacimiento), azar.choice(SEXOS[:2]) if azar.random() < 0.98 else SEXOS[2],
+                f"11{azar.randrange(10**8):08d}", f"{self._nombre(azar)} ({azar.randrange(10**8):08d})",
+                azar.choice(GRUPOS_SANGUINEOS),
+                round(azar.uniform(1.50, 1.95), 2) if edad >= 18 else round(0.5 + edad * 0.07, 2),
+                round(azar.uniform(50, 110), 1) if edad >= 18 else round(3 + edad * 3.5, 1),
+            )
+
+    # --- Historia clínica ---
+
+    def _cantidad(self, azar, cronico, media, rango_cronico):
+        if cronico:
+            return azar.randint(*rango_cronico)
+        return int(azar.expovariate(1 / media))
+
+    def _atencion(self, azar, cabecera):
+        """Médico, hospital y especialidad de una atención: el de cabecera o uno según la demanda."""
+        if azar.random() < PROB_CABECERA:
+            id_medico = cabecera
+        else:
+            id_medico = 1 + _elegir(azar, self._demanda_medicos)
+        hospitales, id_categoria = self._medicos[id_medico - 1]
+        return id_medico, azar.choice(hospitales), id_categoria
+
+    def _fecha(self, azar, nacimiento):
+        inicio = max(nacimiento, self.desde.toordinal())
+        return date.fromordinal(inicio + azar.randrange(self.hasta.toordinal() - inicio + 1))
+
+    def consultas(self):
+        azar = self._azar("consulta_medica")
+        ids = itertools.count(1)
+        for dni, nacimiento, cabecera, cronico in self._pacientes:
+            for _ in range(self._cantidad(azar, cronico, CONSULTAS_MEDIA, CONSULTAS_CRONICO)):
+                id_medico, id_hospital, id_categoria = self._atencion(azar, cabecera)
+                yield (next(ids), dni, id_medico, id_hospital, id_categoria,
+                       1 + _elegir(azar, self._gravedad), azar.choice(MOTIVOS_CONSULTA),
+                       self._fecha(azar, nacimiento))
+
+    def estudios_realizados(self):
+        azar = self._azar("estudios_realizados")
+        ids = itertools.count(1)
+        for i, (dni, nacimiento, cabecera, cronico) in enumerate(self._pacientes):
+            # Solo la mitad de los crónicos acumula miles de estudios
+            con_muchos = cronico and i % 2 == 0
+            for _ in range(self._cantidad(azar, con_muchos, ESTUDIOS_MEDIA, ESTUDIOS_CRONICO)):
+                id_medico, id_hospital, _ = self._atencion(azar, cabecera)
+                id_estudio, id_categoria_estudio = azar.choice(self._estudios)
+                yield (next(ids), dni, id_medico, id_hospital, id_categoria_estudio, id_estudio,
+                       self._fecha(azar, nacimiento), azar.choice(OBSERVACIONES))
+
+    def recetas(self):
+        azar = self._azar("medicamento_recetado")
+        ids = itertools.count(1)
+        hasta = self.hasta.toordinal()
+        for dni, nacimiento, cabecera, cronico in self._pacientes:
+            for _ in range(self._cantidad(azar, cronico, RECETAS_MEDIA, RECETAS_CRONICO)):
+                id_medico, _, _ = self._atencion(azar, cabecera)
+                inicio = self._fecha(azar, nacimiento)
+                fin = inicio.toordinal() + azar.choice(DURACIONES)
+                # Tratamientos que siguen vigentes a la fecha de corte, algunos sin fecha de fin
+                fin = None if fin > hasta and azar.random() < 0.5 else date.fromordinal(fin)
+                yield (next(ids), dni, id_medico, 1 + azar.randrange(self._n_medicamentos),
+                       f"1 comprimido {azar.choice(FRECUENCIAS)}", inicio, fin)
+
+
+def copiar(conn, tabla, columnas, filas, lote=LOTE_COPY):
+    """
+    Carga las filas con COPY en lotes de `lote` filas.
+
+    Returns:
+        int: Filas copiadas.
+    """
+    from psycopg2 import sql
+
+    copia = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(tabla), sql.SQL(", ").join(map(sql.Identifier, columnas)),
+    ).as_string(conn)
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    total = 0
+    with conn.cursor() as cursor:
+        def vaciar():
+            buffer.seek(0)
+            cursor.copy_expert(copia, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+
+        for fila in filas:
+            # En CSV un campo vacío sin comillas es NULL: None se escribe así
+            escritor.writerow(fila)
+            total += 1
+            if total % lote == 0:
+                vaciar()
+        if buffer.tell():
+            vaciar()
+    return total
+
+
+def preparar_destino(conn, esquema, crear, vaciar):
+    """Fija el search_path, crea las tablas si hace falta y verifica que estén vacías."""
+    from psycopg2 import sql
+
+    with conn.cursor() as cursor:
+        if esquema:
+            if crear:
+                cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(esquema)))
+            cursor.execute(sql.SQL("SET search_path TO {}, public").format(sql.Identifier(esquema)))
+
+        cursor.execute("SELECT to_regclass('pacientes') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            if not crear:
+                sys.exit("No existen las tablas de SyncSalud en el destino (use --crear).")
+            with open(ESQUEMA_SQL, encoding="utf-8") as f:
+                cursor.execute(f.read())
+
+        if vaciar:
+            cursor.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY CASCADE").format(
+                sql.SQL(", ").join(map(sql.Identifier, TABLAS))))
+            return
+
+        for tabla in TABLAS:
+            cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {})").format(sql.Identifier(tabla)))
+            if cursor.fetchone()[0]:
+                sys.exit(f"La tabla {tabla} ya tiene datos (use --vaciar para borrarlos antes).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=DSN_POR_DEFECTO, help="base donde cargar los datos")
+    parser.add_argument("--escala", type=float, default=1.0, help="1 = 100.000 pacientes (~2 M de filas)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date(2025, 12, 31),
+                        help="fecha de corte de la historia clínica (AAAA-MM-DD)")
+    parser.add_argument("--esquema", help="esquema de destino (por defecto, el search_path de la conexión)")
+    parser.add_argument("--crear", action="store_true", help="crear el esquema y las tablas si no existen")
+    parser.add_argument("--vaciar", action="store_true", help="vaciar las tablas antes de cargar")
+    parser.add_argument("--forzar", action="store_true", help="permitir una base que no es local")
+    args = parser.parse_args()
+
+    verificar_local(args.dsn, args.forzar, "El generador escribe en todas las tablas")
+
+    import psycopg2
+    from psycopg2 import sql
+
+    generador = Generador(args.semilla, args.escala, args.hasta)
+    print(f"Escala {args.escala} (semilla {args.semilla}): {generador.n_hospitales} hospitales, "
+          f"{generador.n_medicos} médicos, {generador.n_pacientes} pacientes", file=sys.stderr)
+
+    conn = psycopg2.connect(args.dsn)
+    inicio_total = time.perf_counter()
+    total = 0
+    try:
+        preparar_destino(conn, args.esquema, args.crear, args.vaciar)
+        for tabla, columnas, filas, serial in generador.tablas():
+            inicio = time.perf_counter()
+            n = copiar(conn, tabla, columnas, filas)
+            if serial and n:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT setval(pg_get_serial_sequence(%s, %s), %s)", (tabla, serial, n))
+            segundos = time.perf_counter() - inicio
+            total += n
+            print(f"  {tabla:<22}{n:>12,} filas {segundos:>8.1f} s {n / max(segundos, 1e-9):>12,.0f} filas/s",
+                  file=sys.stderr)
+        conn.commit()
+
+        # ANALYZE fuera de la transacción de carga, para que el planificador vea los datos
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for tabla in TABLAS:
+                cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(tabla)))
+    except BaseException:
+        if not conn.autocommit:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"Total: {total:,} filas en {time.perf_counter() - inicio_total:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
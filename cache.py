@@ -0,0 +1,178 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_SIN_VALOR = object()
+
+
+def estimar_tamaño(valor):
+    """
+    Tamaño aproximado en bytes de un valor cacheado.
+
+    Los DataFrame se miden con memory_usage(deep=True); listas, tuplas,
+    diccionarios y conjuntos se recorren un nivel hacia adentro por elemento.
+    """
+    memory_usage = getattr(valor, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(deep=True).sum())
+        except TypeError:
+            pass
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_tamaño(k) + estimar_tamaño(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(estimar_tamaño(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class TTLCache:
+    """
+    Caché en memoria del proceso, compartida por todas las sesiones.
+
+    Cada entrada vence a los `ttl` segundos. Cuando se supera `max_entries` o
+    `max_bytes` se descartan las entradas usadas hace más tiempo (LRU).
+    get_or_load() garantiza que, para una misma clave, un solo hilo consulte
+    la base mientras los demás esperan su resultado.
+    """
+
+    def __init__(self, ttl, max_entries=1024, max_bytes=None, nombre=""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nombre = nombre
+
+        self._lock = threading.RLock()
+        self._datos = OrderedDict()  # clave -> (valor, vence, tamaño)
+        self._cargando = {}  # clave -> threading.Lock
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def _quitar(self, clave):
+        _, _, tamaño = self._datos.pop(clave)
+        self._bytes -= tamaño
+
+    def _recortar(self):
+        while self._datos and (
+            len(self._datos) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._quitar(next(iter(self._datos)))
+
+    def get(self, clave, default=None):
+        """Devuelve el valor vigente de `clave`, o `default` si no está o venció."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._misses += 1
+                return default
+            valor, vence, _ = entrada
+            if vence <= time.monotonic():
+                self._quitar(clave)
+                self._misses += 1
+                return default
+            self._datos.move_to_end(clave)
+            self._hits += 1
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        """
+        Guarda `valor` bajo `clave`.
+
+        Args:
+            ttl (float, optional): Vigencia en segundos; por defecto la de la caché.
+        """
+        tamaño = estimar_tamaño(valor)
+        vence = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            if self.max_bytes is not None and tamaño > self.max_bytes:
+                return
+            self._datos[clave] = (valor, vence, tamaño)
+            self._bytes += tamaño
+            self._recortar()
+
+    def get_or_load(self, clave, loader, ttl=None, cache_if=None):
+        """
+        Devuelve el valor cacheado o lo calcula con `loader()` y lo guarda.
+
+        Args:
+            loader (callable): Función sin argumentos que obtiene el valor.
+            ttl (float, optional): Vigencia para este valor.
+            cache_if (callable, optional): Si devuelve False para el valor
+                cargado, no se guarda (p. ej. resultados vacíos por error).
+        """
+        valor = self.get(clave, _SIN_VALOR)
+        if valor is not _SIN_VALOR:
+            return valor
+
+        with self._lock:
+            lock_clave = self._cargando.setdefault(clave, threading.Lock())
+        with lock_clave:
+            # Otro hilo pudo haberlo cargado mientras esperábamos
+            valor = self.get(clave, _SIN_VALOR)
+            if valor is not _SIN_VALOR:
+                return valor
+            try:
+                valor = loader()
+                if cache_if is None or cache_if(valor):
+                    self.set(clave, valor, ttl=ttl)
+                return valor
+            finally:
+                with self._lock:
+                    self._cargando.pop(clave, None)
+
+    def invalidate(self, *claves):
+        """Quita las claves indicadas; sin argumentos vacía la caché."""
+        with self._lock:
+            if not claves:
+                self._datos.clear()
+                self._bytes = 0
+                return
+            for clave in claves:
+                if clave in self._datos:
+                    self._quitar(clave)
+
+    def invalidate_where(self, condicion):
+        """Quita todas las entradas cuya clave cumple `condicion(clave)`."""
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                self._quitar(clave)
+
+    def stats(self):
+        """Entradas, bytes estimados, aciertos y fallos de la caché."""
+        with self._lock:
+            return {
+                'nombre': self.nombre,
+                'entries': len(self._datos),
+                'bytes': self._bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+
+class Versiones:
+    """
+    Contador de versión por clave (p. ej. por DNI de paciente).
+
+    Sirve para invalidar de a una clave sin recorrer la caché: quien cachea
+    incluye la versión actual en la clave de cada entrada y quien escribe la
+    incrementa. Las entradas con una versión vieja ya no se consultan y las
+    descarta el LRU o el TTL de la caché.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones = {}
+
+    def actual(self, clave):
+        """Versión vigente de `clave` (0 si nunca se incrementó)."""
+        return self._versiones.get(clave, 0)
+
+    def incrementar(self, *claves):
+        """Pasa las claves indicadas a una versión nueva."""
+        with self._lock:
+            for clave in claves:
+                self._versiones[clave] = self._versiones.get(clave, 0) + 1
@@ -0,0 +1,112 @@
+"""
+Lectura columnar de resultados: COPY ... TO STDOUT leído directo a Arrow.
+
+En lugar de fetchall() (una tupla de objetos Python por fila) y luego
+pd.DataFrame(...), el servidor manda el resultado como CSV y pyarrow lo
+convierte columna por columna en arreglos tipados. El DataFrame resultante
+queda respaldado por Arrow (pd.ArrowDtype), que st.dataframe muestra sin
+convertir de nuevo.
+
+Los tipos de cada columna se toman de la descripción de la consulta (OID de
+PostgreSQL), que se pide una sola vez por SQL y se recuerda.
+"""
+import io
+import threading
+
+_descripciones = {}
+_descripciones_lock = threading.Lock()
+
+# OID de PostgreSQL -> nombre del tipo Arrow; lo que no está se lee como texto.
+# numeric (1700) queda en texto a propósito: como float64 perdería precisión y
+# la descripción no trae la precisión y escala que pediría un decimal128.
+_TIPOS_ARROW = {
+    16: "bool_",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    26: "int64",  # oid
+    700: "float32",
+    701: "float64",
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+def _tipo_arrow(pa, oid):
+    nombre = _TIPOS_ARROW.get(oid, "string")
+    if nombre == "timestamp":
+        return pa.timestamp("us")
+    if nombre == "timestamptz":
+        # COPY escribe el desplazamiento de la sesión (p. ej. -03); Arrow lo pasa a UTC
+        return pa.timestamp("us", tz="UTC")
+    return getattr(pa, nombre)()
+
+
+def describir(cursor, sql, params=None):
+    """
+    Nombres y OID de las columnas que devuelve `sql`, sin traer filas.
+
+    Returns:
+        tuple: ((nombre, oid), ...)
+    """
+    with _descripciones_lock:
+        descripcion = _descripciones.get(sql)
+    if descripcion is None:
+        cursor.execute(f"SELECT * FROM ({sql}) AS q LIMIT 0", params)
+        descripcion = tuple((col.name, col.type_code) for col in cursor.description)
+        with _descripciones_lock:
+            _descripciones[sql] = descripcion
+    return descripcion
+
+
+def leer_tabla_arrow(cursor, sql, params=None):
+    """
+    Ejecuta un SELECT con COPY y devuelve el resultado como pyarrow.Table.
+
+    Args:
+        cursor: Cursor de psycopg2.
+        sql (str): Consulta SELECT con parámetros %s.
+        params (tuple, optional): Parámetros; se interpolan del lado del
+            cliente con mogrify porque COPY no admite parámetros.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from psycopg2.extensions import encodings
+
+    sql = sql.strip().rstrip(";")
+    descripcion = describir(cursor, sql, params)
+    nombres = [nombre for nombre, _ in descripcion]
+
+    consulta = cursor.mogrify(sql, params).decode(encodings[cursor.connection.encoding])
+    buffer = io.BytesIO()
+    cursor.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv)", buffer)
+    if buffer.tell() == 0:
+        return pa.table({nombre: pa.array([], type=_tipo_arrow(pa, oid)) for nombre, oid in descripcion})
+    buffer.seek(0)
+
+    return pa_csv.read_csv(
+        buffer,
+        read_options=pa_csv.ReadOptions(column_names=nombres),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={nombre: _tipo_arrow(pa, oid) for nombre, oid in descripcion},
+            # COPY escribe NULL como campo vacío y el texto vacío como ""
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+
+
+def leer_dataframe(cursor, sql, params=None):
+    """
+    Igual que leer_tabla_arrow pero devuelve un DataFrame respaldado por Arrow.
+
+    Returns:
+        pandas.DataFrame: Columnas con dtype pd.ArrowDtype.
+    """
+    import pandas as pd
+
+    return leer_tabla_arrow(cursor, sql, params).to_pandas(types_mapper=pd.ArrowDtype)
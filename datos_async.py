@@ -0,0 +1,241 @@
+"""
+Capa de datos asíncrona: las mismas consultas con nombre de queries.py,
+ejecutadas con asyncio para poder lanzar varias a la vez.
+
+Con psycopg 3 instalado (psycopg y psycopg-pool, opcionales) usa su propio
+pool asíncrono, independiente del pool de db_pool.py pero con las mismas
+variables SUPABASE_DB_*. Sin psycopg 3 cada consulta corre en un hilo con
+functions.ejecutar_consulta, así que el código que la usa funciona igual.
+
+Todo corre en un único bucle de eventos del proceso, en un hilo propio: los
+scripts de Streamlit lo usan con correr(), que espera el resultado sin tocar
+el bucle del servidor.
+
+Ejemplo, desde una página:
+
+    import datos_async
+
+    datos = datos_async.correr(datos_async.reunir(
+        medico=("medico_por_dni", (dni_medico,)),
+        hospitales=("hospitales", None),
+        paciente=("paciente_por_dni", (dni_paciente,)),
+    ))
+    datos["hospitales"]  # DataFrame, como lo devolvería ejecutar_consulta
+
+El pool se configura con SYNCSALUD_ASYNC_POOL_MAX_SIZE (10 por defecto) y
+SUPABASE_POOL_TIMEOUT, y se cierra al terminar el proceso.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import threading
+
+import queries
+import instrumentacion
+from instrumentacion import medir, contar_filas
+from db_pool import detectar_modo_pooler, usar_sentencias_preparadas
+
+_bucle = None
+_bucle_lock = threading.Lock()
+
+_pool = None
+_pool_lock = None  # asyncio.Lock, se crea dentro del bucle
+_sin_pool = False
+
+# Segundos que se espera al pool al cerrar el proceso
+ESPERA_CIERRE = 5
+
+
+def _get_bucle():
+    """Bucle de eventos del proceso, corriendo en un hilo daemon."""
+    global _bucle
+    if _bucle is None:
+        with _bucle_lock:
+            if _bucle is None:
+                bucle = asyncio.new_event_loop()
+                threading.Thread(target=bucle.run_forever, name="datos_async", daemon=True).start()
+                _bucle = bucle
+    return _bucle
+
+
+def _cerrar():
+    """Cierra el pool asíncrono y detiene el bucle; se registra con atexit."""
+    bucle = _bucle
+    if bucle is None or not bucle.is_running():
+        return
+    if _pool is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(_pool.close(), bucle).result(ESPERA_CIERRE)
+        except Exception as e:
+            print(f"Error cerrando el pool asíncrono: {e}")
+    bucle.call_soon_threadsafe(bucle.stop)
+
+
+atexit.register(_cerrar)
+
+
+def _conninfo():
+    variables = {
+        "host": os.getenv("SUPABASE_DB_HOST"),
+        "port": os.getenv("SUPABASE_DB_PORT"),
+        "dbname": os.getenv("SUPABASE_DB_NAME"),
+        "user": os.getenv("SUPABASE_DB_USER"),
+        "password": os.getenv("SUPABASE_DB_PASSWORD"),
+    }
+    if not all(variables.values()):
+        return None
+    from psycopg.conninfo import make_conninfo
+    return make_conninfo(**variables)
+
+
+async def _get_pool():
+    """
+    Pool asíncrono de psycopg 3, creado la primera vez. Devuelve None si
+    psycopg 3 no está instalado o falta la configuración de la base.
+    """
+    global _pool, _pool_lock, _sin_pool
+    if _pool is not None or _sin_pool:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is not None or _sin_pool:
+            return _pool
+        try:
+            from psycopg_pool import AsyncConnectionPool
+            conninfo = _conninfo()
+        except ImportError:
+            print("psycopg 3 no está instalado: las consultas asíncronas corren en hilos.")
+            _sin_pool = True
+            return None
+        if conninfo is None:
+            print("Error: One or more Supabase environment variables are not set.")
+            _sin_pool = True
+            return None
+
+        pool = AsyncConnectionPool(
+            conninfo,
+            min_size=1,
+            max_size=int(os.getenv("SYNCSALUD_ASYNC_POOL_MAX_SIZE", "10")),
+            timeout=float(os.getenv("SUPABASE_POOL_TIMEOUT", "10")),
+            # Solo se preparan las consultas marcadas en queries.py, como en el pool sincrónico
+            kwargs={"prepare_threshold": None},
+            open=False,
+        )
+        await pool.open()
+        _pool = pool
+    return _pool
+
+
+async def _ejecutar(pool, consulta, params, preparar, m):
+    import pandas as pd
+
+    inicio = asyncio.get_running_loop().time()
+    async with pool.connection() as conn:
+        m.espera = asyncio.get_running_loop().time() - inicio
+        async with conn.cursor() as cursor:
+            await cursor.execute(consulta.sql, params, prepare=True if preparar else None)
+            if cursor.description:
+                colnames = [desc.name for desc in cursor.description]
+                return pd.DataFrame(await cursor.fetchall(), columns=colnames)
+    # Al salir del bloque el pool hace commit (o rollback si hubo error)
+    return True
+
+
+async def consultar(nombre, params=None):
+    """
+    Ejecuta una consulta del registro (queries.py) por su nombre.
+
+    Args:
+        nombre (str): Nombre de la consulta registrada.
+        params (tuple, optional): Parámetros posicionales.
+
+    Returns:
+        pandas.DataFrame or bool: Lo mismo que functions.ejecutar_consulta:
+            DataFrame para SELECT (y escrituras con RETURNING), True/False para
+            escrituras sin resultados; DataFrame vacío o False si falla.
+    """
+    import pandas as pd
+
+    consulta = queries.obtener(nombre)
+    pool = await _get_pool()
+    if pool is None:
+        from functions import ejecutar_consulta
+        return await asyncio.to_thread(ejecutar_consulta, nombre, params)
+
+    preparar = consulta.preparar and usar_sentencias_preparadas(detectar_modo_pooler())
+    with medir(nombre, params) as m:
+        try:
+            result = await _ejecutar(pool, consulta, params, preparar, m)
+        except Exception as e:
+            print(f"Error executing query '{nombre}': {e}")
+            m.error = e
+            result = False if consulta.escritura else pd.DataFrame()
+        m.filas = contar_filas(result)
+    return result
+
+
+async def reunir(**pedidos):
+    """
+    Ejecuta varias consultas independientes a la vez.
+
+    Args:
+        **pedidos: nombre de resultado -> (nombre de la consulta, parámetros).
+
+    Returns:
+        dict: nombre de resultado -> resultado de consultar().
+    """
+    claves = list(pedidos)
+    resultados = await asyncio.gather(*(consultar(*pedidos[clave]) for clave in claves))
+    return dict(zip(claves, resultados))
+
+
+def correr(corrutina, timeout=None):
+    """
+    Ejecuta una corrutina en el bucle de la capa asíncrona y espera su
+    resultado. Es el puente para los scripts de Streamlit, que son sincrónicos.
+
+    Las consultas quedan en el registro de la ejecución de la página que
+    llamó (panel de rendimiento), igual que las sincrónicas.
+
+    Args:
+        corrutina: Por ejemplo reunir(...) o consultar(...).
+        timeout (float, optional): Segundos máximos de espera; al vencer se
+            cancela la corrutina y se lanza TimeoutError.
+    """
+    bucle = _get_bucle()
+    try:
+        en_el_bucle = asyncio.get_running_loop() is bucle
+    except RuntimeError:
+        en_el_bucle = False
+    if en_el_bucle:
+        raise RuntimeError("correr() no puede llamarse desde el bucle de datos_async; usar await.")
+
+    # La tarea se crea dentro de una copia del contexto de quien llama, así
+    # comparte su registro de consultas
+    instrumentacion.registro_actual()
+    contexto = contextvars.copy_context()
+    resultado = concurrent.futures.Future()
+    tareas = []
+
+    def terminar(tarea):
+        if tarea.cancelled():
+            resultado.cancel()
+        elif tarea.exception() is not None:
+            resultado.set_exception(tarea.exception())
+        else:
+            resultado.set_result(tarea.result())
+
+    def lanzar():
+        tarea = contexto.run(bucle.create_task, corrutina)
+        tarea.add_done_callback(terminar)
+        tareas.append(tarea)
+
+    bucle.call_soon_threadsafe(lanzar)
+    try:
+        return resultado.result(timeout)
+    except concurrent.futures.TimeoutError:
+        bucle.call_soon_threadsafe(lambda: [tarea.cancel() for tarea in tareas])
+        raise
@@ -0,0 +1,318 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Puertos del pooler de Supabase: 6543 es modo transacción, 5432 modo sesión
+PUERTO_POOLER_TRANSACCION = "6543"
+
+MODO_TRANSACCION = "transaction"
+MODO_SESION = "session"
+
+
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no se libera ninguna conexión dentro del tiempo de espera."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    Conexión de psycopg2 que guarda cuánto esperó al salir del pool y qué
+    sentencias preparadas ya existen en su sesión del servidor.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_wait = 0.0
+        self.preparadas = set()
+
+
+def connect_to_supabase():
+    """
+    Connects to the Supabase PostgreSQL database using transaction pooler details
+    and credentials stored in environment variables.
+    """
+    try:
+        # Retrieve connection details from environment variables
+        host = os.getenv("SUPABASE_DB_HOST")
+        port = os.getenv("SUPABASE_DB_PORT")
+        dbname = os.getenv("SUPABASE_DB_NAME")
+        user = os.getenv("SUPABASE_DB_USER")
+        password = os.getenv("SUPABASE_DB_PASSWORD")
+
+        # Check if all required environment variables are set
+        if not all([host, port, dbname, user, password]):
+            print("Error: One or more Supabase environment variables are not set.")
+            print("Please set SUPABASE_DB_HOST, SUPABASE_DB_PORT, SUPABASE_DB_NAME, SUPABASE_DB_USER, and SUPABASE_DB_PASSWORD.")
+            return None
+
+        # Establish the connection
+        conn = psycopg2.connect(
+            host=host,
+            port=port,
+            dbname=dbname,
+            user=user,
+            password=password,
+            connection_factory=PooledConnection,
+        )
+        print("Successfully connected to Supabase database.")
+        return conn
+    except psycopg2.Error as e:
+        print(f"Error connecting to Supabase database: {e}")
+        return None
+
+
+def detectar_modo_pooler():
+    """
+    Determina si la base está detrás de un pooler en modo transacción o sesión.
+
+    Se puede forzar con SUPABASE_POOL_MODE; si no, se deduce del puerto.
+
+    Returns:
+        str: MODO_TRANSACCION o MODO_SESION.
+    """
+    modo = os.getenv("SUPABASE_POOL_MODE", "").strip().lower()
+    if modo in (MODO_TRANSACCION, MODO_SESION):
+        return modo
+    if os.getenv("SUPABASE_DB_PORT", "").strip() == PUERTO_POOLER_TRANSACCION:
+        return MODO_TRANSACCION
+    return MODO_SESION
+
+
+def usar_sentencias_preparadas(modo):
+    """
+    Indica si conviene usar PREPARE/EXECUTE con el pooler actual.
+
+    SUPABASE_PREPARED_STATEMENTS acepta "on", "off" o "auto" (por defecto).
+    En "auto" se desactivan en modo transacción, donde cada transacción puede
+    caer en una conexión de servidor distinta y la sentencia no existiría.
+    """
+    valor = os.getenv("SUPABASE_PREPARED_STATEMENTS", "auto").strip().lower()
+    if valor == "on":
+        return True
+    if valor == "off":
+        return False
+    return modo == MODO_SESION
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones compartido por todos los hilos del servidor.
+
+    Las conexiones se crean bajo demanda hasta `max_size`. Al pedir una conexión
+    se espera como máximo `timeout` segundos y, si estuvo ociosa más de
+    `health_check_after` segundos, se verifica con un SELECT 1 antes de entregarla.
+    """
+
+    def __init__(self, factory, max_size=10, timeout=10.0, health_check_after=30.0, modo=MODO_SESION):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.modo = modo
+        self.preparar = usar_sentencias_preparadas(modo)
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexión, momento en que quedó ociosa)
+        self._in_use = set()
+        self._opening = 0
+
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def _esta_sana(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _descartar(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """
+        Toma una conexión del pool.
+
+        Returns:
+            psycopg2.extensions.connection: Conexión lista para usar.
+
+        Raises:
+            PoolAgotadoError: Si no hay conexión disponible dentro de `timeout`.
+        """
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        while True:
+            with self._cond:
+                while not self._idle and len(self._in_use) + self._opening >= self.max_size:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolAgotadoError(
+                            f"No hay conexiones libres tras {self.timeout:.1f}s "
+                            f"(máximo {self.max_size})."
+                        )
+                    self._cond.wait(restante)
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use.add(conn)
+                    nueva = False
+                else:
+                    self._opening += 1
+                    nueva = True
+
+            if nueva:
+                conn = None
+                try:
+                    conn = self._factory()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if conn is not None:
+                            self._created += 1
+                            self._in_use.add(conn)
+                        self._cond.notify()
+                if conn is None:
+                    raise psycopg2.OperationalError("No se pudo conectar a la base de datos.")
+            elif not self._esta_sana(conn, idle_since):
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._descartar(conn)
+                    self._cond.notify()
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._waits += 1
+                self._wait_total += espera
+                self._wait_max = max(self._wait_max, espera)
+            conn.pool_wait = espera
+            return conn
+
+    def putconn(self, conn, close=False):
+        """
+        Devuelve una conexión al pool, descartándola si quedó rota.
+
+        Args:
+            conn (psycopg2.extensions.connection): Conexión obtenida con getconn().
+            close (bool, optional): Cerrar la conexión en lugar de reutilizarla.
+        """
+        if not close and not conn.closed:
+            try:
+                # Nunca devolver una conexión con una transacción abierta
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed:
+                self._descartar(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Cierra todas las conexiones ociosas del pool."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._descartar(conn)
+
+    def stats(self):
+        """
+        Estadísticas en vivo del pool.
+
+        Returns:
+            dict: Conexiones en uso, ociosas, esperas y tiempos de espera en segundos.
+        """
+        with self._cond:
+            return {
+                'modo': self.modo,
+                'prepared_statements': self.preparar,
+                'max_size': self.max_size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'created': self._created,
+                'discarded': self._discarded,
+                'checkouts': self._waits,
+                'timeouts': self._timeouts,
+                'wait_avg': self._wait_total / self._waits if self._waits else 0.0,
+                'wait_max': self._wait_max,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Devuelve el pool del proceso, creándolo la primera vez.
+
+    Se configura con SUPABASE_POOL_MAX_SIZE, SUPABASE_POOL_TIMEOUT y
+    SUPABASE_POOL_HEALTH_CHECK_AFTER.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect_to_supabase,
+                    max_size=int(os.getenv("SUPABASE_POOL_MAX_SIZE", "10")),
+                    timeout=float(os.getenv("SUPABASE_POOL_TIMEOUT", "10")),
+                    health_check_after=float(os.getenv("SUPABASE_POOL_HEALTH_CHECK_AFTER", "30")),
+                    modo=detectar_modo_pooler(),
+                )
+    return _pool
+
+
+@contextmanager
+def borrow_connection():
+    """
+    Presta una conexión del pool durante el bloque `with` y la devuelve al salir.
+
+    Si el bloque termina con una excepción se hace rollback antes de devolverla.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def pool_stats():
+    """Atajo a get_pool().stats()."""
+    return get_pool().stats()
@@ -0,0 +1,535 @@
+"""
+Intercambio de historias clínicas como Bundle FHIR R4 en streaming.
+
+La exportación escribe el Bundle recurso por recurso, leyendo cada tabla con un
+cursor del lado del servidor. La importación recorre el JSON con ijson sin
+cargarlo entero y escribe en lotes. En ambos casos la memoria usada no depende
+del tamaño del Bundle.
+
+Uso:
+    python fhir.py exportar historias.json [--dni 12345678]
+    python fhir.py importar historias.json [--lote 500]
+
+Correspondencia con las tablas:
+    pacientes            -> Patient
+    consulta_medica      -> Encounter
+    estudios_realizados  -> DiagnosticReport
+    medicamento_recetado -> MedicationRequest
+
+Hospitales, especialidades, estudios y medicamentos viajan por nombre (los ids
+son propios de cada sistema) y al importar se traducen con un mapa en memoria
+de las tablas de referencia. Médicos y pacientes se identifican por DNI.
+
+Consultas, estudios y recetas llevan su identificador de origen
+(urn:syncsalud:id); al importar se anota en fhir_importados, así un recurso ya
+importado no se vuelve a insertar.
+"""
+import argparse
+import json
+import sys
+import uuid
+from datetime import date, datetime
+
+from db_pool import borrow_connection
+from instrumentacion import medir
+import queries
+
+SISTEMA_DNI = "urn:syncsalud:dni"
+SISTEMA_GRAVEDAD = "urn:syncsalud:gravedad"
+SISTEMA_ID_LOCAL = "urn:syncsalud:id"
+
+_SEXO_A_FHIR = {"M": "male", "F": "female", "Otro": "other"}
+_FHIR_A_SEXO = {v: k for k, v in _SEXO_A_FHIR.items()}
+
+# Errores que se guardan para mostrar; el resto solo se cuenta
+MAX_ERRORES_GUARDADOS = 1000
+
+
+class RecursoInvalidoError(ValueError):
+    """El recurso FHIR no trae los datos necesarios o no se pueden mapear."""
+
+
+# --- Exportación ---
+
+def _fecha(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _sin_vacios(dic):
+    """Quita claves con None o texto vacío, que FHIR no admite."""
+    return {k: v for k, v in dic.items() if v not in (None, "", [], {})}
+
+
+def _full_url(recurso):
+    """URN estable del recurso dentro del Bundle (FHIR exige urn:uuid:<uuid>)."""
+    return f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, SISTEMA_ID_LOCAL + ':' + recurso['id'])}"
+
+
+def _ref_dni(tipo, dni, nombre=None):
+    return _sin_vacios({
+        "type": tipo,
+        "identifier": {"system": SISTEMA_DNI, "value": str(dni)},
+        "display": nombre,
+    })
+
+
+def paciente_a_fhir(fila):
+    dni, nombre, sexo, nacimiento, telefono, obra_social, contacto, grupo = fila
+    return _sin_vacios({
+        "resourceType": "Patient",
+        "id": f"paciente-{dni}",
+        "identifier": [{"system": SISTEMA_DNI, "value": str(dni)}],
+        "name": [{"text": nombre}],
+        "gender": _SEXO_A_FHIR.get(sexo, "unknown"),
+        "birthDate": _fecha(nacimiento),
+        "telecom": [{"system": "phone", "value": telefono}] if telefono else None,
+        "contact": [{"telecom": [{"system": "phone", "value": contacto}]}] if contacto else None,
+        "extension": [
+            ext for ext in (
+                {"url": "urn:syncsalud:obra-social", "valueString": obra_social} if obra_social else None,
+                {"url": "urn:syncsalud:grupo-sanguineo", "valueString": grupo} if grupo else None,
+            ) if ext
+        ],
+    })
+
+
+def consulta_a_fhir(fila):
+    id_consulta, dni, fecha, gravedad, detalle, hospital, especialidad, medico, dni_medico = fila
+    return _sin_vacios({
+        "resourceType": "Encounter",
+        "id": f"consulta-{id_consulta}",
+        "identifier": [{"system": SISTEMA_ID_LOCAL, "value": f"consulta_medica/{id_consulta}"}],
+        "status": "finished",
+        "class": {"system": "http://terminology.hl7.org/CodeSystem/v3-ActCode", "code": "AMB"},
+        "subject": _ref_dni("Patient", dni),
+        "participant": [{"individual": _ref_dni("Practitioner", dni_medico, medico)}],
+        "period": {"start": _fecha(fecha)},
+        "serviceType": {"text": especialidad},
+        "serviceProvider": {"type": "Organization", "display": hospital},
+        "priority": {"coding": [{"system": SISTEMA_GRAVEDAD, "code": str(gravedad)}]},
+        "reasonCode": [{"text": detalle}] if detalle else None,
+    })
+
+
+def estudio_a_fhir(fila):
+    id_estudio, dni, fecha, observaciones, categoria, estudio, hospital, medico, dni_medico = fila
+    return _sin_vacios({
+        "resourceType": "DiagnosticReport",
+        "id": f"estudio-{id_estudio}",
+        "identifier": [{"system": SISTEMA_ID_LOCAL, "value": f"estudios_realizados/{id_estudio}"}],
+        "status": "final",
+        "category": [{"text": categoria}],
+        "code": {"text": estudio},
+        "subject": _ref_dni("Patient", dni),
+        "effectiveDateTime": _fecha(fecha),
+        "performer": [
+            _ref_dni("Practitioner", dni_medico, medico),
+            {"type": "Organization", "display": hospital},
+        ],
+        "conclusion": observaciones,
+    })
+
+
+def receta_a_fhir(fila):
+    id_receta, dni, indicaciones, inicio, fin, medicamento, medico, dni_medico = fila
+    terminada = fin is not None and fin < date.today()
+    return _sin_vacios({
+        "resourceType": "MedicationRequest",
+        "id": f"receta-{id_receta}",
+        "identifier": [{"system": SISTEMA_ID_LOCAL, "value": f"medicamento_recetado/{id_receta}"}],
+        "status": "completed" if terminada else "active",
+        "intent": "order",
+        "medicationCodeableConcept": {"text": medicamento},
+        "subject": _ref_dni("Patient", dni),
+        "requester": _ref_dni("Practitioner", dni_medico, medico),
+        "authoredOn": _fecha(inicio),
+        "dosageInstruction": [_sin_vacios({
+            "text": indicaciones,
+            "timing": {"repeat": {"boundsPeriod": _sin_vacios({"start": _fecha(inicio), "end": _fecha(fin)})}},
+        })],
+    })
+
+
+# Orden de exportación: los pacientes primero, así al importar ya existen
+_EXPORTACION = (
+    ("fhir_pacientes", paciente_a_fhir),
+    ("fhir_consultas", consulta_a_fhir),
+    ("fhir_estudios", estudio_a_fhir),
+    ("fhir_recetas", receta_a_fhir),
+)
+
+
+def exportar_bundle(salida, dni=None, lote=1000):
+    """
+    Escribe un Bundle FHIR (type "collection") en `salida` a medida que lee la base.
+
+    Args:
+        salida: Archivo de texto abierto para escritura.
+        dni (str, optional): Exportar solo este paciente; por defecto, todos.
+        lote (int, optional): Filas que trae cada viaje del cursor del servidor.
+
+    Returns:
+        dict: Cantidad de recursos exportados por tipo.
+    """
+    cantidades = {}
+    salida.write('{"resourceType": "Bundle", "type": "collection", "timestamp": ')
+    salida.write(json.dumps(datetime.now().astimezone().isoformat()))
+    salida.write(', "entry": [')
+
+    primero = True
+    with borrow_connection() as conn:
+        for nombre, convertir in _EXPORTACION:
+            # Cursor con nombre: el servidor entrega `lote` filas por vez
+            with medir(nombre, (dni, dni)) as m, conn.cursor(name=f"exportacion_{nombre}") as cursor:
+                cursor.itersize = lote
+                cursor.execute(queries.obtener(nombre).sql, (dni, dni))
+                for fila in cursor:
+                    m.filas += 1
+                    recurso = convertir(fila)
+                    if not primero:
+                        salida.write(",")
+                    salida.write("\n")
+                    json.dump({"fullUrl": _full_url(recurso), "resource": recurso},
+                              salida, ensure_ascii=False)
+                    primero = False
+                    cantidades[recurso["resourceType"]] = cantidades.get(recurso["resourceType"], 0) + 1
+        conn.rollback()
+
+    salida.write("\n]}\n")
+    return cantidades
+
+
+# --- Importación ---
+
+class MapaReferencias:
+    """
+    Traduce nombres e identificadores del Bundle a ids de las tablas de referencia.
+
+    Se carga una sola vez por importación; su tamaño depende de las tablas de
+    referencia, no del Bundle.
+    """
+
+    def __init__(self, conn):
+        def pares(nombre):
+            with medir(nombre) as m, conn.cursor() as cursor:
+                cursor.execute(queries.obtener(nombre).sql)
+                filas = cursor.fetchall()
+                m.filas = len(filas)
+            return filas
+
+        self.hospitales = {n.strip().lower(): i for i, n in pares("hospitales")}
+        self.categorias = {n.strip().lower(): i for i, n in pares("categorias")}
+        self.medicamentos = {n.strip().lower(): i for i, n in pares("medicamentos")}
+        self.medicos = {str(dni): i for dni, i in pares("fhir_mapa_medicos")}
+        self.estudios = {}
+        self.estudios_por_nombre = {}
+        for id_estudio, nombre, id_categoria, categoria in pares("fhir_mapa_estudios"):
+            valor = (id_categoria, id_estudio)
+            self.estudios[(categoria.strip().lower(), nombre.strip().lower())] = valor
+            self.estudios_por_nombre.setdefault(nombre.strip().lower(), valor)
+
+    @staticmethod
+    def _buscar(tabla, texto, que):
+        clave = (texto or "").strip().lower()
+        if clave not in tabla:
+            raise RecursoInvalidoError(f"{que} desconocido: '{texto}'")
+        return tabla[clave]
+
+    def hospital(self, nombre):
+        return self._buscar(self.hospitales, nombre, "hospital")
+
+    def categoria(self, nombre):
+        return self._buscar(self.categorias, nombre, "especialidad")
+
+    def medicamento(self, nombre):
+        return self._buscar(self.medicamentos, nombre, "medicamento")
+
+    def estudio(self, categoria, nombre):
+        clave = ((categoria or "").strip().lower(), (nombre or "").strip().lower())
+        if clave in self.estudios:
+            return self.estudios[clave]
+        return self._buscar(self.estudios_por_nombre, nombre, "estudio")
+
+    def medico(self, referencia):
+        dni = _dni_de(referencia)
+        if dni not in self.medicos:
+            raise RecursoInvalidoError(f"médico desconocido (DNI {dni})")
+        return self.medicos[dni]
+
+
+def _dni_de(referencia):
+    identificador = (referencia or {}).get("identifier") or {}
+    if identificador.get("system") != SISTEMA_DNI or not identificador.get("value"):
+        raise RecursoInvalidoError("referencia sin DNI")
+    return str(identificador["value"])
+
+
+def _texto(concepto):
+    concepto = concepto or {}
+    if concepto.get("text"):
+        return concepto["text"]
+    for coding in concepto.get("coding") or []:
+        if coding.get("display"):
+            return coding["display"]
+    return None
+
+
+def _solo_fecha(valor):
+    return valor[:10] if valor else None
+
+
+def _extension(recurso, url):
+    for ext in recurso.get("extension") or []:
+        if ext.get("url") == url:
+            return ext.get("valueString")
+    return None
+
+
+def _identificador(recurso):
+    """
+    Identificador del recurso en su sistema de origen, como "sistema|valor".
+    Se prefiere el de SyncSalud; None si el recurso no trae ninguno.
+    """
+    identificadores = [i for i in recurso.get("identifier") or [] if i.get("value")]
+    elegido = next((i for i in identificadores if i.get("system") == SISTEMA_ID_LOCAL),
+                   identificadores[0] if identificadores else None)
+    if elegido is None:
+        return None
+    return f"{elegido.get('system') or ''}|{elegido['value']}"
+
+
+def _requerido(valor, mensaje):
+    """Devuelve `valor`, o lanza RecursoInvalidoError con `mensaje` si falta."""
+    if valor is None or valor == "":
+        raise RecursoInvalidoError(mensaje)
+    return valor
+
+
+def _fecha_nacimiento(valor, hoy=None):
+    """Fecha de nacimiento completa y en rango, como en importacion.validar_paciente."""
+    texto = _requerido(_solo_fecha(valor), "Patient sin fecha de nacimiento")
+    try:
+        fecha = date.fromisoformat(texto)
+    except ValueError:
+        # FHIR admite fechas parciales (solo año o año y mes), la tabla no
+        raise RecursoInvalidoError(f"fecha de nacimiento inválida: '{valor}'") from None
+    if not date(1900, 1, 1) <= fecha <= (hoy or date.today()):
+        raise RecursoInvalidoError(f"fecha de nacimiento fuera de rango: {fecha}")
+    return fecha.isoformat()
+
+
+def fhir_a_paciente(recurso, mapa):
+    dni = next((i.get("value") for i in recurso.get("identifier") or [] if i.get("system") == SISTEMA_DNI), None)
+    if not dni:
+        raise RecursoInvalidoError("Patient sin DNI")
+    nombre = next((n.get("text") or " ".join(n.get("given", []) + [n.get("family", "")]).strip()
+                   for n in recurso.get("name") or []), None)
+    nombre = _requerido((nombre or "").strip(), "Patient sin nombre")
+    telefono = next((t.get("value") for t in recurso.get("telecom") or [] if t.get("system") == "phone"), None)
+    contacto = next((t.get("value") for c in recurso.get("contact") or [] for t in c.get("telecom") or []), None)
+    return (str(dni), nombre, _extension(recurso, "urn:syncsalud:obra-social"), _fecha_nacimiento(recurso.get("birthDate")),
+            _FHIR_A_SEXO.get(recurso.get("gender"), "Otro"), telefono, contacto,
+            _extension(recurso, "urn:syncsalud:grupo-sanguineo"))
+
+
+def fhir_a_consulta(recurso, mapa):
+    participante = (recurso.get("participant") or [{}])[0].get("individual")
+    gravedad = next((c.get("code") for c in (recurso.get("priority") or {}).get("coding") or []
+                     if c.get("system") == SISTEMA_GRAVEDAD), None)
+    servicio = recurso.get("serviceType") or {}
+    return (
+        _identificador(recurso),
+        _dni_de(recurso.get("subject")),
+        mapa.medico(participante),
+        mapa.hospital((recurso.get("serviceProvider") or {}).get("display")),
+        mapa.categoria(_texto(servicio)),
+        int(_requerido(gravedad, "Encounter sin gravedad")),
+        _texto((recurso.get("reasonCode") or [{}])[0]),
+        _requerido(_solo_fecha((recurso.get("period") or {}).get("start")), "Encounter sin fecha"),
+    )
+
+
+def fhir_a_estudio(recurso, mapa):
+    performers = recurso.get("performer") or []
+    medico = next((p for p in performers if p.get("type") == "Practitioner"), None)
+    hospital = next((p for p in performers if p.get("type") == "Organization"), {})
+    id_categoria, id_estudio = mapa.estudio(_texto((recurso.get("category") or [{}])[0]), _texto(recurso.get("code")))
+    return (
+        _identificador(recurso),
+        _dni_de(recurso.get("subject")),
+        mapa.medico(medico),
+        mapa.hospital(hospital.get("display")),
+        id_categoria,
+        id_estudio,
+        _requerido(_solo_fecha(recurso.get("effectiveDateTime")), "DiagnosticReport sin fecha"),
+        recurso.get("conclusion"),
+    )
+
+
+def fhir_a_receta(recurso, mapa):
+    dosis = (recurso.get("dosageInstruction") or [{}])[0]
+    periodo = ((dosis.get("timing") or {}).get("repeat") or {}).get("boundsPeriod") or {}
+    return (
+        _identificador(recurso),
+        _dni_de(recurso.get("subject")),
+        mapa.medico(recurso.get("requester")),
+        mapa.medicamento(_requerido(_texto(recurso.get("medicationCodeableConcept")),
+                                    "MedicationRequest sin medicamento")),
+        dosis.get("text"),
+        _requerido(_solo_fecha(periodo.get("start") or recurso.get("authoredOn")),
+                   "MedicationRequest sin fecha de inicio"),
+        _solo_fecha(periodo.get("end")),
+    )
+
+
+# Tipo de recurso -> (conversión a fila, consulta de inserción por lote)
+_IMPORTACION = {
+    "Patient": (fhir_a_paciente, "fhir_insertar_pacientes"),
+    "Encounter": (fhir_a_consulta, "fhir_insertar_consultas"),
+    "DiagnosticReport": (fhir_a_estudio, "fhir_insertar_estudios"),
+    "MedicationRequest": (fhir_a_receta, "fhir_insertar_recetas"),
+}
+
+
+def importar_bundle(archivo, lote=500, progreso=None):
+    """
+    Importa un Bundle FHIR leyendo sus entradas de a una.
+
+    Los recursos se acumulan por tipo y se insertan de a `lote` filas, cada
+    lote en su transacción. Antes de escribir consultas, estudios o recetas se
+    escriben los pacientes pendientes, para que ya existan. Los recursos cuyo
+    identificador ya se importó antes se omiten, así reimportar un Bundle no
+    duplica la historia.
+    Si la base rechaza un lote, sus recursos se cuentan como errores y la
+    importación sigue con el resto del Bundle.
+
+    Args:
+        archivo: Archivo binario con el Bundle JSON.
+        lote (int, optional): Filas por inserción.
+        progreso (callable, optional): Se llama tras cada lote con el resumen parcial.
+
+    Returns:
+        dict: {'success': bool, 'message': str, 'leidos': int, 'insertados': dict,
+            'omitidos': int, 'con_error': int, 'errores': list of (recurso, motivo)}
+    """
+    try:
+        import ijson
+    except ImportError:
+        return {'success': False, 'message': "Para importar FHIR hace falta instalar ijson.",
+                'leidos': 0, 'insertados': {}, 'omitidos': 0, 'con_error': 0, 'errores': []}
+
+    from psycopg2.extras import execute_values
+
+    resultado = {
+        'success': False, 'message': '', 'leidos': 0,
+        'insertados': {tipo: 0 for tipo in _IMPORTACION}, 'omitidos': 0, 'con_error': 0, 'errores': [],
+    }
+    # Por tipo, pares (etiqueta del recurso, fila a insertar)
+    pendientes = {tipo: [] for tipo in _IMPORTACION}
+
+    def registrar_error(etiqueta, motivo):
+        resultado['con_error'] += 1
+        if len(resultado['errores']) < MAX_ERRORES_GUARDADOS:
+            resultado['errores'].append((etiqueta, motivo))
+
+    def escribir(conn, tipo):
+        lote_actual = pendientes[tipo]
+        if not lote_actual:
+            return
+        pendientes[tipo] = []
+        filas = [fila for _, fila in lote_actual]
+        nombre = _IMPORTACION[tipo][1]
+        try:
+            with medir(nombre, (len(filas),)) as m:
+                with conn.cursor() as cursor:
+                    devueltas = execute_values(cursor, queries.obtener(nombre).sql, filas,
+                                               page_size=len(filas), fetch=True)
+                conn.commit()
+                m.filas = len(devueltas)
+        except Exception as e:
+            # Los lotes anteriores ya quedaron guardados: se sigue con el resto
+            conn.rollback()
+            print(f"Error importando lote de {tipo}: {e}")
+            for etiqueta, _ in lote_actual:
+                registrar_error(etiqueta, f"lote rechazado por la base: {e}")
+        else:
+            resultado['insertados'][tipo] += len(devueltas)
+            # Pacientes ya existentes, recursos ya importados o registros de
+            # pacientes desconocidos
+            resultado['omitidos'] += len(filas) - len(devueltas)
+        if progreso is not None:
+            progreso(resultado)
+
+    def escribir_todo(conn):
+        for tipo in _IMPORTACION:  # Patient primero
+            escribir(conn, tipo)
+
+    try:
+        with borrow_connection() as conn:
+            mapa = MapaReferencias(conn)
+            conn.rollback()
+            # use_float para que los números del JSON no lleguen como Decimal
+            for recurso in ijson.items(archivo, "entry.item.resource", use_float=True):
+                resultado['leidos'] += 1
+                tipo = recurso.get("resourceType")
+                if tipo not in _IMPORTACION:
+                    resultado['omitidos'] += 1
+                    continue
+                etiqueta = f"{tipo}/{recurso.get('id', '?')}"
+                try:
+                    pendientes[tipo].append((etiqueta, _IMPORTACION[tipo][0](recurso, mapa)))
+                except (RecursoInvalidoError, ValueError, TypeError) as e:
+                    registrar_error(etiqueta, str(e))
+                    continue
+                if len(pendientes[tipo]) >= lote:
+                    if tipo != "Patient":
+                        escribir(conn, "Patient")
+                    escribir(conn, tipo)
+            escribir_todo(conn)
+    except Exception as e:
+        print(f"Error importando Bundle FHIR: {e}")
+        resultado['message'] = f"Error durante la importación: {e}"
+        return resultado
+
+    resultado['success'] = True
+    insertados = ", ".join(f"{n} {tipo}" for tipo, n in resultado['insertados'].items())
+    resultado['message'] = (
+        f"Se leyeron {resultado['leidos']} recursos. Insertados: {insertados}. "
+        f"Omitidos: {resultado['omitidos']}. Con errores: {resultado['con_error']}."
+    )
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="accion", required=True)
+
+    exportar = sub.add_parser("exportar", help="escribir un Bundle con las historias clínicas")
+    exportar.add_argument("archivo")
+    exportar.add_argument("--dni", help="exportar solo este paciente")
+    exportar.add_argument("--lote", type=int, default=1000)
+
+    importar = sub.add_parser("importar", help="cargar un Bundle en la base")
+    importar.add_argument("archivo")
+    importar.add_argument("--lote", type=int, default=500)
+
+    args = parser.parse_args()
+
+    if args.accion == "exportar":
+        with open(args.archivo, "w", encoding="utf-8") as salida:
+            cantidades = exportar_bundle(salida, dni=args.dni, lote=args.lote)
+        print(", ".join(f"{n} {tipo}" for tipo, n in cantidades.items()) or "Sin recursos para exportar.")
+    else:
+        with open(args.archivo, "rb") as archivo:
+            resultado = importar_bundle(archivo, lote=args.lote)
+        print(resultado['message'])
+        for recurso, motivo in resultado['errores']:
+            print(f"  {recurso}: {motivo}")
+        if not resultado['success']:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
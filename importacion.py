@@ -0,0 +1,259 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+from itertools import islice
+
+from db_pool import borrow_connection
+from instrumentacion import medir
+import queries
+
+# Grupos sanguíneos válidos; el formulario de Administración agrega la opción vacía
+GRUPOS_SANGUINEOS = ("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-")
+SEXOS = ("M", "F", "Otro")
+
+# Columnas de pacientes en el orden en que se copian a la tabla temporal
+COLUMNAS_PACIENTE = ("dni_paciente", "nombre", "obra_social", "fecha_nacimiento",
+                     "sexo", "telefono", "contacto_emergencia", "grupo_sanguineo")
+
+# Nombres alternativos aceptados en el encabezado del archivo
+_ALIAS_COLUMNAS = {
+    "dni": "dni_paciente",
+    "nombre_completo": "nombre",
+    "nombre_y_apellido": "nombre",
+    "fecha_de_nacimiento": "fecha_nacimiento",
+    "grupo_sangre": "grupo_sanguineo",
+    "grupo": "grupo_sanguineo",
+}
+
+_FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+_DNI = re.compile(r"^\d{7,8}$")
+
+# Errores por fila que se guardan para mostrar; el resto solo se cuenta
+MAX_ERRORES_GUARDADOS = 1000
+
+
+class ArchivoInvalidoError(Exception):
+    """El archivo no se puede leer o le faltan columnas obligatorias."""
+
+
+def _normalizar_columna(nombre):
+    clave = re.sub(r"\s+", "_", str(nombre or "").strip().lower())
+    return _ALIAS_COLUMNAS.get(clave, clave)
+
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda DNI y teléfonos numéricos como float
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    for formato in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"fecha de nacimiento inválida: '{texto}'")
+
+
+def validar_paciente(registro, hoy=None):
+    """
+    Valida y normaliza una fila del archivo de importación.
+
+    Args:
+        registro (dict): Valores de la fila por nombre de columna.
+        hoy (datetime.date, optional): Fecha máxima de nacimiento.
+
+    Returns:
+        tuple: Valores en el orden de COLUMNAS_PACIENTE.
+
+    Raises:
+        ValueError: Con el motivo si la fila no es válida.
+    """
+    hoy = hoy or date.today()
+
+    dni = _texto(registro.get("dni_paciente")).replace(".", "")
+    if not _DNI.match(dni):
+        raise ValueError(f"DNI inválido: '{dni}'")
+
+    nombre = _texto(registro.get("nombre"))
+    if not nombre:
+        raise ValueError("falta el nombre")
+
+    fecha_nacimiento = _fecha(registro.get("fecha_nacimiento"))
+    if not date(1900, 1, 1) <= fecha_nacimiento <= hoy:
+        raise ValueError(f"fecha de nacimiento fuera de rango: {fecha_nacimiento}")
+
+    sexo = _texto(registro.get("sexo"))
+    if sexo not in SEXOS:
+        raise ValueError(f"sexo inválido: '{sexo}' (use {', '.join(SEXOS)})")
+
+    grupo = _texto(registro.get("grupo_sanguineo")).upper()
+    if grupo and grupo not in GRUPOS_SANGUINEOS:
+        raise ValueError(f"grupo sanguíneo inválido: '{grupo}'")
+
+    return (dni, nombre, _texto(registro.get("obra_social")), fecha_nacimiento, sexo,
+            _texto(registro.get("telefono")), _texto(registro.get("contacto_emergencia")), grupo)
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(texto)
+    finally:
+        # Sin detach, al liberarse el wrapper cerraría también el archivo original
+        texto.detach()
+
+
+def _filas_excel(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ArchivoInvalidoError("Para importar Excel hace falta instalar openpyxl.") from None
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_registros(archivo, nombre_archivo):
+    """
+    Recorre el archivo fila por fila sin cargarlo entero.
+
+    Args:
+        archivo: Archivo binario (p. ej. el de st.file_uploader).
+        nombre_archivo (str): Nombre original, para distinguir CSV de Excel.
+
+    Yields:
+        tuple: (número de fila en el archivo, dict columna -> valor)
+
+    Raises:
+        ArchivoInvalidoError: Si el formato no es soportado o faltan columnas.
+    """
+    extension = nombre_archivo.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        filas = _filas_csv(archivo)
+    elif extension in ("xlsx", "xlsm"):
+        filas = _filas_excel(archivo)
+    else:
+        raise ArchivoInvalidoError(f"Formato no soportado: .{extension} (use CSV o Excel)")
+
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ArchivoInvalidoError("El archivo está vacío.")
+    columnas = [_normalizar_columna(c) for c in encabezado]
+    faltantes = {"dni_paciente", "nombre", "fecha_nacimiento", "sexo"} - set(columnas)
+    if faltantes:
+        raise ArchivoInvalidoError(f"Faltan columnas: {', '.join(sorted(faltantes))}")
+
+    for numero, valores in enumerate(filas, start=2):
+        if not any(_texto(v) for v in valores):
+            continue
+        yield numero, dict(zip(columnas, valores))
+
+
+def _copiar_lote(conn, lote):
+    """Copia un lote validado a la tabla temporal y hace el upsert en una transacción."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for numero, valores in lote:
+        escritor.writerow((numero,) + tuple("" if v is None else v for v in valores))
+    buffer.seek(0)
+
+    # Un error se registra en la medición y sigue hacia importar_pacientes
+    with medir("importacion_pacientes_upsert", (len(lote),)) as m:
+        with conn.cursor() as cursor:
+            cursor.execute(queries.obtener("importacion_pacientes_staging").sql)
+            cursor.copy_expert(queries.obtener("importacion_pacientes_copy").sql, buffer)
+            cursor.execute(queries.obtener("importacion_pacientes_upsert").sql)
+            resultados = cursor.fetchall()
+        conn.commit()
+        m.filas = len(resultados)
+
+    insertadas = sum(1 for (insertado,) in resultados if insertado)
+    return insertadas, len(resultados) - insertadas
+
+
+def importar_pacientes(archivo, nombre_archivo, tamaño_lote=5000, progreso=None):
+    """
+    Importa pacientes desde un CSV o Excel en lotes de `tamaño_lote` filas.
+
+    Cada lote válido se guarda con COPY a una tabla temporal y un upsert sobre
+    pacientes en su propia transacción, así la memoria no depende del tamaño
+    del archivo y un lote con error no deshace los anteriores.
+
+    Args:
+        archivo: Archivo binario a importar.
+        nombre_archivo (str): Nombre original del archivo (.csv o .xlsx).
+        tamaño_lote (int, optional): Filas por lote.
+        progreso (callable, optional): Se llama tras cada lote con el dict de
+            resultados parciales.
+
+    Returns:
+        dict: {'success': bool, 'message': str, 'procesadas': int, 'insertadas': int,
+            'actualizadas': int, 'con_error': int, 'errores': list of (fila, dni, motivo)}
+    """
+    resultado = {
+        'success': False, 'message': '', 'procesadas': 0, 'insertadas': 0,
+        'actualizadas': 0, 'con_error': 0, 'errores': [],
+    }
+
+    def registrar_error(numero, dni, motivo):
+        resultado['con_error'] += 1
+        if len(resultado['errores']) < MAX_ERRORES_GUARDADOS:
+            resultado['errores'].append((numero, dni, motivo))
+
+    hoy = date.today()
+    try:
+        registros = leer_registros(archivo, nombre_archivo)
+        with borrow_connection() as conn:
+            while True:
+                bloque = list(islice(registros, tamaño_lote))
+                if not bloque:
+                    break
+
+                lote = []
+                for numero, registro in bloque:
+                    resultado['procesadas'] += 1
+                    try:
+                        lote.append((numero, validar_paciente(registro, hoy)))
+                    except ValueError as e:
+                        registrar_error(numero, _texto(registro.get("dni_paciente")), str(e))
+
+                if lote:
+                    try:
+                        insertadas, actualizadas = _copiar_lote(conn, lote)
+                        resultado['insertadas'] += insertadas
+                        resultado['actualizadas'] += actualizadas
+                    except Exception as e:
+                        conn.rollback()
+                        print(f"Error importando lote: {e}")
+                        for numero, valores in lote:
+                            registrar_error(numero, valores[0], f"lote rechazado por la base: {e}")
+
+                if progreso is not None:
+                    progreso(resultado)
+    except ArchivoInvalidoError as e:
+        resultado['message'] = str(e)
+        return resultado
+    except Exception as e:
+        print(f"Error importando pacientes: {e}")
+        resultado['message'] = f"Error durante la importación: {e}"
+        return resultado
+
+    resultado['success'] = True
+    resultado['message'] = (
+        f"Se procesaron {resultado['procesadas']} filas: {resultado['insertadas']} pacientes nuevos, "
+        f"{resultado['actualizadas']} actualizados y {resultado['con_error']} con errores."
+    )
+    return resultado
@@ -0,0 +1,170 @@
+import contextvars
+import logging
+import os
+import time
+from collections import Counter, namedtuple
+
+# Registro de las consultas ejecutadas durante una ejecución de la página.
+# Vive en una ContextVar: los hilos que lanza la página con
+# contextvars.copy_context() (p. ej. las secciones del Historial) comparten la
+# misma lista que el hilo principal.
+ConsultaRegistrada = namedtuple(
+    "ConsultaRegistrada",
+    ["nombre", "forma_params", "huella_params", "segundos", "filas", "espera", "error", "momento"],
+)
+
+MAX_CONSULTAS_POR_EJECUCION = 500
+
+_registro = contextvars.ContextVar("registro_consultas", default=None)
+
+UMBRAL_LENTA_MS = float(os.getenv("SYNCSALUD_SLOW_QUERY_MS", "500"))
+ARCHIVO_LENTAS = os.getenv("SYNCSALUD_SLOW_QUERY_LOG", "slow_queries.log")
+
+_logger_lentas = None
+
+
+def _logger():
+    """Logger del archivo de consultas lentas, creado la primera vez que hace falta."""
+    global _logger_lentas
+    if _logger_lentas is None:
+        logger = logging.getLogger("syncsalud.consultas_lentas")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if ARCHIVO_LENTAS and not logger.handlers:
+            handler = logging.FileHandler(ARCHIVO_LENTAS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        _logger_lentas = logger
+    return _logger_lentas
+
+
+def registro_actual():
+    """
+    Lista de consultas de la ejecución actual, creándola si todavía no existe.
+
+    Conviene llamarla antes de copiar el contexto para otros hilos, así todos
+    escriben en la misma lista.
+    """
+    registro = _registro.get()
+    if registro is None:
+        registro = []
+        _registro.set(registro)
+    return registro
+
+
+def reiniciar_registro():
+    """Empieza un registro vacío (p. ej. al terminar de mostrar el panel)."""
+    _registro.set([])
+
+
+def forma_de_parametros(params):
+    """
+    Describe los parámetros por tipo, sin sus valores (DNI, nombres...).
+
+    Returns:
+        str: Por ejemplo "(str, date, date)".
+    """
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(p).__name__ for p in params) + ")"
+
+
+def contar_filas(resultado):
+    """Filas de un resultado de ejecutar_consulta/execute_query (0 para True/False)."""
+    if isinstance(resultado, (bool, type(None))):
+        return 0
+    try:
+        return len(resultado)
+    except TypeError:
+        return 0
+
+
+def registrar_consulta(nombre, params, segundos, filas, espera=0.0, error=None):
+    """
+    Anota una consulta en el registro de la ejecución y, si fue lenta, en el
+    archivo de consultas lentas (SYNCSALUD_SLOW_QUERY_LOG, a partir de
+    SYNCSALUD_SLOW_QUERY_MS milisegundos).
+
+    Args:
+        nombre (str): Nombre de la consulta del registro o una descripción corta.
+        params: Parámetros usados; solo se guarda su forma y una huella.
+        segundos (float): Tiempo total, incluida la espera de conexión.
+        filas (int): Filas devueltas.
+        espera (float, optional): Segundos esperando una conexión del pool.
+        error (Exception, optional): Error, si la consulta falló.
+    """
+    try:
+        huella = hash(repr(params))
+    except Exception:
+        huella = None
+    consulta = ConsultaRegistrada(
+        nombre, forma_de_parametros(params), huella, segundos, filas, espera,
+        None if error is None else f"{type(error).__name__}: {error}", time.time(),
+    )
+
+    registro = registro_actual()
+    if len(registro) < MAX_CONSULTAS_POR_EJECUCION:
+        registro.append(consulta)
+
+    if segundos * 1000 >= UMBRAL_LENTA_MS and ARCHIVO_LENTAS:
+        _logger().info(
+            "%s %.1fms filas=%d espera=%.1fms params=%s%s",
+            nombre, segundos * 1000, filas, espera * 1000, consulta.forma_params,
+            f" error={consulta.error}" if consulta.error else "",
+        )
+
+
+class medir:
+    """
+    Context manager que mide un bloque y lo registra al salir.
+
+    Ejemplo:
+        with medir("buscar_pacientes", params) as m:
+            resultado = ...
+            m.filas = len(resultado)
+    """
+
+    def __init__(self, nombre, params=None):
+        self.nombre = nombre
+        self.params = params
+        self.filas = 0
+        self.espera = 0.0
+        # Para errores que el bloque atrapa y no propaga
+        self.error = None
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        if isinstance(error, GeneratorExit):
+            # Un generador cerrado antes de terminar no es un error
+            error = None
+        registrar_consulta(self.nombre, self.params, time.perf_counter() - self._inicio,
+                           self.filas, self.espera, error or self.error)
+        return False
+
+
+def resumen(registro=None):
+    """
+    Totales del registro para el panel de rendimiento.
+
+    Returns:
+        dict: consultas, segundos, filas, espera y duplicadas (nombre con los
+            mismos parámetros más de una vez -> cantidad).
+    """
+    registro = list(registro_actual() if registro is None else registro)
+    repetidas = Counter((c.nombre, c.huella_params) for c in registro)
+    duplicadas = Counter()
+    for (nombre, _), n in repetidas.items():
+        if n > 1:
+            duplicadas[nombre] += n
+    return {
+        'consultas': len(registro),
+        'segundos': sum(c.segundos for c in registro),
+        'filas': sum(c.filas for c in registro),
+        'espera': sum(c.espera for c in registro),
+        'duplicadas': dict(duplicadas),
+    }
@@ -0,0 +1,43 @@
+"""
+Índices para lo que se consulta por paciente: historial de consultas, estudios
+y medicación, en el orden en que las páginas los recorren (ver las consultas
+*_pagina de queries.py, que paginan por keyset sobre estas mismas columnas).
+"""
+from migrar import Verificacion
+
+# CONCURRENTLY no bloquea las escrituras mientras se construye el índice
+TRANSACCION = False
+
+SQL = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS consulta_medica_paciente_gravedad_idx
+        ON consulta_medica (id_paciente, clasificacion DESC, fecha_consulta DESC, id_consulta DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS estudios_realizados_paciente_fecha_idx
+        ON estudios_realizados (dni_paciente, fecha DESC, id_estudio_realizado DESC)
+    """,
+    # Medicación anterior: rango sobre la fecha de fin dentro del paciente
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS medicamento_recetado_paciente_fin_idx
+        ON medicamento_recetado (id_paciente, fecha_terminacion_medicamento)
+    """,
+    # Medicación vigente sin fecha de fin: parcial, solo los tratamientos abiertos
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS medicamento_recetado_vigente_idx
+        ON medicamento_recetado (id_paciente, fecha_inicio_medicamento DESC)
+        WHERE fecha_terminacion_medicamento IS NULL
+    """,
+]
+
+VERIFICACIONES = [
+    Verificacion("historial_pagina",
+                 "SELECT id_paciente, 26 FROM consulta_medica LIMIT 1", "consulta_medica"),
+    Verificacion("estudios_pagina",
+                 "SELECT dni_paciente, 26 FROM estudios_realizados LIMIT 1", "estudios_realizados"),
+    Verificacion("medicacion_actual",
+                 "SELECT id_paciente, current_date, current_date FROM medicamento_recetado LIMIT 1",
+                 "medicamento_recetado"),
+    Verificacion("medicacion_anterior",
+                 "SELECT id_paciente, current_date FROM medicamento_recetado LIMIT 1", "medicamento_recetado"),
+]
@@ -0,0 +1,37 @@
+"""
+Índices de búsqueda: login por nombre de usuario, médico por DNI, estudios por
+categoría y el buscador incremental de pacientes (prefijo de DNI o parte del
+nombre, ver buscar_pacientes en queries.py).
+"""
+from migrar import Verificacion
+
+TRANSACCION = False
+
+SQL = [
+    # En public y no en el primer esquema del search_path: si ese esquema se
+    # borra (los de benchmarks), se llevaría la extensión que usan los demás
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS users_nombre_usuario_idx ON users (nombre_usuario)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS medicos_dni_idx ON medicos (dni)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS estudios_tipo_estudio_idx ON estudios (tipo_estudio)",
+    # LIKE 'prefijo%' sobre el DNI
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS pacientes_dni_prefijo_idx
+        ON pacientes (dni_paciente text_pattern_ops)
+    """,
+    # ILIKE '%texto%' sobre el nombre
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS pacientes_nombre_trgm_idx
+        ON pacientes USING gin (nombre gin_trgm_ops)
+    """,
+]
+
+# estudios es un catálogo de decenas de filas: ahí leer la tabla entera es el
+# plan correcto y no se verifica.
+VERIFICACIONES = [
+    Verificacion("login", "SELECT nombre_usuario FROM users LIMIT 1", "users"),
+    Verificacion("medico_por_dni", "SELECT dni FROM medicos LIMIT 1", "medicos"),
+    Verificacion("buscar_pacientes",
+                 "SELECT left(dni_paciente, 6), 'garc', left(dni_paciente, 6), 20 FROM pacientes LIMIT 1",
+                 "pacientes"),
+]
@@ -0,0 +1,27 @@
+"""
+Índices por médico para "pacientes recientes" (pacientes_recientes_medico en
+queries.py), que junta consultas, estudios y recetas de un médico.
+"""
+from migrar import Verificacion
+
+TRANSACCION = False
+
+SQL = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS consulta_medica_medico_fecha_idx
+        ON consulta_medica (id_medico, fecha_consulta)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS estudios_realizados_medico_fecha_idx
+        ON estudios_realizados (id_medico, fecha)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS medicamento_recetado_medico_inicio_idx
+        ON medicamento_recetado (id_medico, fecha_inicio_medicamento)
+    """,
+]
+
+VERIFICACIONES = [
+    Verificacion("pacientes_recientes_medico",
+                 "SELECT id_medico, id_medico, id_medico, 10 FROM medicos LIMIT 1", "consulta_medica"),
+]
@@ -0,0 +1,150 @@
+"""
+Resumen por paciente (paciente_resumen): cantidad de consultas y estudios,
+última consulta y último estudio, gravedad máxima de los últimos 365 días y
+medicamentos vigentes. Lo leen el Historial y el buscador de pacientes en
+lugar de recorrer las tablas de historia.
+
+Se mantiene con triggers por sentencia sobre consulta_medica,
+estudios_realizados y medicamento_recetado: cada INSERT, UPDATE, DELETE o COPY
+recalcula una sola vez a los pacientes que tocó.
+
+La gravedad reciente y la medicación vigente dependen del día: vigente_hasta
+guarda la primera fecha en que alguna de las dos cambia sin que se escriba
+nada. Quien lee una fila vencida la recalcula (ver obtener_datos_paciente en
+functions.py); refrescar_paciente_resumen() recalcula todas las vencidas y
+puede programarse una vez por día (p. ej. con pg_cron).
+"""
+from migrar import Verificacion
+
+SQL = [
+    """
+    CREATE TABLE paciente_resumen (
+        dni_paciente           varchar PRIMARY KEY REFERENCES pacientes (dni_paciente) ON DELETE CASCADE,
+        consultas              integer NOT NULL DEFAULT 0,
+        ultima_consulta        date,
+        gravedad_max_reciente  integer,           -- últimos 365 días
+        medicacion_activa      integer NOT NULL DEFAULT 0,
+        estudios               integer NOT NULL DEFAULT 0,
+        ultimo_estudio         date,
+        vigente_hasta          date,              -- NULL: no cambia con el paso de los días
+        actualizado            timestamptz NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE INDEX paciente_resumen_vigente_hasta_idx ON paciente_resumen (vigente_hasta)
+    """,
+    # Recalcula desde cero el resumen de los pacientes indicados
+    """
+    CREATE FUNCTION recalcular_paciente_resumen(p_dnis varchar[]) RETURNS integer
+    LANGUAGE sql AS $$
+        WITH recalculados AS (
+            INSERT INTO paciente_resumen AS r
+                (dni_paciente, consultas, ultima_consulta, gravedad_max_reciente,
+                 medicacion_activa, estudios, ultimo_estudio, vigente_hasta, actualizado)
+            SELECT p.dni_paciente, c.consultas, c.ultima_consulta, c.gravedad_max_reciente,
+                   m.medicacion_activa, e.estudios, e.ultimo_estudio,
+                   least(c.sale_de_la_ventana, m.termina, m.empieza), now()
+            FROM pacientes p
+            CROSS JOIN LATERAL (
+                SELECT count(*)::integer AS consultas,
+                       max(fecha_consulta) AS ultima_consulta,
+                       max(clasificacion) FILTER (WHERE fecha_consulta > current_date - 365)
+                           AS gravedad_max_reciente,
+                       min(fecha_consulta) FILTER (WHERE fecha_consulta > current_date - 365) + 365
+                           AS sale_de_la_ventana
+                FROM consulta_medica WHERE id_paciente = p.dni_paciente
+            ) c
+            CROSS JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE vigente)::integer AS medicacion_activa,
+                       min(fecha_terminacion_medicamento) FILTER (WHERE vigente) + 1 AS termina,
+                       min(fecha_inicio_medicamento) FILTER (WHERE fecha_inicio_medicamento > current_date)
+                           AS empieza
+                FROM (
+                    SELECT fecha_inicio_medicamento, fecha_terminacion_medicamento,
+                           fecha_inicio_medicamento <= current_date
+                           AND (fecha_terminacion_medicamento IS NULL
+                                OR fecha_terminacion_medicamento >= current_date) AS vigente
+                    FROM medicamento_recetado WHERE id_paciente = p.dni_paciente
+                ) mr
+            ) m
+            CROSS JOIN LATERAL (
+                SELECT count(*)::integer AS estudios, max(fecha) AS ultimo_estudio
+                FROM estudios_realizados WHERE dni_paciente = p.dni_paciente
+            ) e
+            WHERE p.dni_paciente = ANY (p_dnis)
+            ON CONFLICT (dni_paciente) DO UPDATE SET
+                consultas = EXCLUDED.consultas,
+                ultima_consulta = EXCLUDED.ultima_consulta,
+                gravedad_max_reciente = EXCLUDED.gravedad_max_reciente,
+                medicacion_activa = EXCLUDED.medicacion_activa,
+                estudios = EXCLUDED.estudios,
+                ultimo_estudio = EXCLUDED.ultimo_estudio,
+                vigente_hasta = EXCLUDED.vigente_hasta,
+                actualizado = EXCLUDED.actualizado
+            RETURNING 1
+        )
+        SELECT count(*)::integer FROM recalculados
+    $$
+    """,
+    # Para programar una vez por día: recalcula los resúmenes vencidos
+    """
+    CREATE FUNCTION refrescar_paciente_resumen() RETURNS integer
+    LANGUAGE sql AS $$
+        SELECT recalcular_paciente_resumen(array_agg(dni_paciente))
+        FROM paciente_resumen
+        WHERE vigente_hasta <= current_date
+    $$
+    """,
+    # Trigger por sentencia: el argumento es la columna con el DNI del paciente
+    """
+    CREATE FUNCTION paciente_resumen_trigger() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        dnis varchar[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM nuevas', TG_ARGV[0]) INTO dnis;
+        ELSIF TG_OP = 'DELETE' THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM viejas', TG_ARGV[0]) INTO dnis;
+        ELSE
+            EXECUTE format('SELECT array_agg(DISTINCT dni) FROM (SELECT %1$I AS dni FROM nuevas '
+                           'UNION SELECT %1$I FROM viejas) AS tocados', TG_ARGV[0]) INTO dnis;
+        END IF;
+        IF dnis IS NOT NULL THEN
+            PERFORM recalcular_paciente_resumen(dnis);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+] + [
+    # Las tablas de transición exigen un trigger por evento
+    sentencia
+    for tabla, columna in (("consulta_medica", "id_paciente"),
+                           ("estudios_realizados", "dni_paciente"),
+                           ("medicamento_recetado", "id_paciente"))
+    for sentencia in (
+        f"""
+        CREATE TRIGGER {tabla}_resumen_insert AFTER INSERT ON {tabla}
+            REFERENCING NEW TABLE AS nuevas
+            FOR EACH STATEMENT EXECUTE FUNCTION paciente_resumen_trigger('{columna}')
+        """,
+        f"""
+        CREATE TRIGGER {tabla}_resumen_update AFTER UPDATE ON {tabla}
+            REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+            FOR EACH STATEMENT EXECUTE FUNCTION paciente_resumen_trigger('{columna}')
+        """,
+        f"""
+        CREATE TRIGGER {tabla}_resumen_delete AFTER DELETE ON {tabla}
+            REFERENCING OLD TABLE AS viejas
+            FOR EACH STATEMENT EXECUTE FUNCTION paciente_resumen_trigger('{columna}')
+        """,
+    )
+] + [
+    # Carga inicial con la historia que ya existe
+    "SELECT recalcular_paciente_resumen(array_agg(dni_paciente)) FROM pacientes",
+]
+
+VERIFICACIONES = [
+    Verificacion("datos_paciente", "SELECT dni_paciente FROM paciente_resumen LIMIT 1", "paciente_resumen"),
+]
@@ -0,0 +1,72 @@
+"""
+Recálculo de paciente_resumen serializado por paciente.
+
+Cada trigger recalcula desde su propia instantánea; dos transacciones que
+escribían historia del mismo paciente a la vez podían dejar en el resumen los
+totales de la que terminó primero (p. ej. 6 consultas con 7 en la tabla).
+Ahora recalcular_paciente_resumen toma un bloqueo consultivo por paciente
+(hasta el fin de la transacción) antes de leer: la segunda espera a que la
+primera confirme y recalcula viendo sus filas.
+"""
+
+SQL = [
+    """
+    CREATE OR REPLACE FUNCTION recalcular_paciente_resumen(p_dnis varchar[]) RETURNS integer
+    LANGUAGE sql AS $$
+        -- Un recálculo por paciente a la vez, en el mismo orden para no trabarse
+        SELECT pg_advisory_xact_lock(hashtext('paciente_resumen'), clave)
+        FROM (SELECT DISTINCT hashtext(dni) AS clave FROM unnest(p_dnis) AS dni) AS claves
+        ORDER BY clave;
+
+        -- Con la función volátil esta sentencia toma una instantánea nueva: ya
+        -- ve lo que confirmó la transacción que tenía el bloqueo
+        WITH recalculados AS (
+            INSERT INTO paciente_resumen AS r
+                (dni_paciente, consultas, ultima_consulta, gravedad_max_reciente,
+                 medicacion_activa, estudios, ultimo_estudio, vigente_hasta, actualizado)
+            SELECT p.dni_paciente, c.consultas, c.ultima_consulta, c.gravedad_max_reciente,
+                   m.medicacion_activa, e.estudios, e.ultimo_estudio,
+                   least(c.sale_de_la_ventana, m.termina, m.empieza), now()
+            FROM pacientes p
+            CROSS JOIN LATERAL (
+                SELECT count(*)::integer AS consultas,
+                       max(fecha_consulta) AS ultima_consulta,
+                       max(clasificacion) FILTER (WHERE fecha_consulta > current_date - 365)
+                           AS gravedad_max_reciente,
+                       min(fecha_consulta) FILTER (WHERE fecha_consulta > current_date - 365) + 365
+                           AS sale_de_la_ventana
+                FROM consulta_medica WHERE id_paciente = p.dni_paciente
+            ) c
+            CROSS JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE vigente)::integer AS medicacion_activa,
+                       min(fecha_terminacion_medicamento) FILTER (WHERE vigente) + 1 AS termina,
+                       min(fecha_inicio_medicamento) FILTER (WHERE fecha_inicio_medicamento > current_date)
+                           AS empieza
+                FROM (
+                    SELECT fecha_inicio_medicamento, fecha_terminacion_medicamento,
+                           fecha_inicio_medicamento <= current_date
+                           AND (fecha_terminacion_medicamento IS NULL
+                                OR fecha_terminacion_medicamento >= current_date) AS vigente
+                    FROM medicamento_recetado WHERE id_paciente = p.dni_paciente
+                ) mr
+            ) m
+            CROSS JOIN LATERAL (
+                SELECT count(*)::integer AS estudios, max(fecha) AS ultimo_estudio
+                FROM estudios_realizados WHERE dni_paciente = p.dni_paciente
+            ) e
+            WHERE p.dni_paciente = ANY (p_dnis)
+            ON CONFLICT (dni_paciente) DO UPDATE SET
+                consultas = EXCLUDED.consultas,
+                ultima_consulta = EXCLUDED.ultima_consulta,
+                gravedad_max_reciente = EXCLUDED.gravedad_max_reciente,
+                medicacion_activa = EXCLUDED.medicacion_activa,
+                estudios = EXCLUDED.estudios,
+                ultimo_estudio = EXCLUDED.ultimo_estudio,
+                vigente_hasta = EXCLUDED.vigente_hasta,
+                actualizado = EXCLUDED.actualizado
+            RETURNING 1
+        )
+        SELECT count(*)::integer FROM recalculados
+    $$
+    """,
+]
@@ -0,0 +1,20 @@
+"""
+Registro de los recursos FHIR importados (fhir_importados).
+
+Cada Encounter, DiagnosticReport o MedicationRequest que entra por fhir.py
+anota aquí su identificador de origen (sistema|valor, p. ej.
+"urn:syncsalud:id|consulta_medica/42") y la fila que generó. Importar de nuevo
+el mismo Bundle, o uno que repite recursos, ya no duplica la historia: los
+identificadores conocidos se omiten.
+"""
+
+SQL = [
+    """
+    CREATE TABLE fhir_importados (
+        identificador  varchar PRIMARY KEY,
+        tabla          varchar NOT NULL,
+        id_registro    integer NOT NULL,
+        importado      timestamptz NOT NULL DEFAULT now()
+    )
+    """,
+]
@@ -0,0 +1,254 @@
+"""
+Migraciones versionadas del esquema de SyncSalud.
+
+Cada archivo migraciones/NNNN_descripcion.py es una migración y define:
+
+    SQL: lista de sentencias, que se ejecutan en orden.
+    TRANSACCION (opcional, True por defecto): con False las sentencias corren
+        en autocommit, para las que no admiten transacción (CREATE INDEX
+        CONCURRENTLY). Si una falla puede quedar un índice inválido: borrarlo
+        con DROP INDEX CONCURRENTLY antes de reintentar.
+    VERIFICACIONES (opcional): lista de Verificacion. Cada una hace EXPLAIN de
+        una consulta de queries.py con parámetros tomados de los datos y exige
+        que el plan lea `tabla` por un índice.
+
+Las versiones aplicadas se anotan en la tabla schema_migraciones del esquema
+actual (search_path), así cada esquema lleva su propia cuenta.
+
+Uso:
+    python migrar.py                  # aplica las pendientes
+    python migrar.py --estado         # qué versiones están aplicadas
+    python migrar.py --verificar      # planes de las consultas sobre los datos actuales
+    python migrar.py --dsn postgresql://...   # otra base (por defecto, SUPABASE_DB_*)
+
+Las verificaciones tienen sentido sobre un volumen realista (p. ej. los datos
+de benchmarks/generador.py); con tablas casi vacías PostgreSQL prefiere, con
+razón, leerlas enteras.
+"""
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+import queries
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+
+Migracion = namedtuple("Migracion", ["version", "nombre", "sql", "transaccion", "verificaciones"])
+
+# consulta: nombre en queries.py; parametros: SELECT que devuelve una fila con
+# los parámetros de la consulta; tabla: la que tiene que leerse por índice
+Verificacion = namedtuple("Verificacion", ["consulta", "parametros", "tabla"])
+
+_ARCHIVO = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+TABLA_VERSIONES = """
+    CREATE TABLE IF NOT EXISTS schema_migraciones (
+        version    integer PRIMARY KEY,
+        nombre     varchar(200) NOT NULL,
+        aplicada   timestamptz NOT NULL DEFAULT now(),
+        segundos   double precision
+    )
+"""
+
+# Nodos del plan que leen por índice
+_NODOS_INDICE = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def cargar_migraciones(directorio=DIRECTORIO):
+    """
+    Lee las migraciones del directorio, ordenadas por versión.
+
+    Returns:
+        list of Migracion
+    """
+    migraciones = []
+    for archivo in sorted(os.listdir(directorio)):
+        coincidencia = _ARCHIVO.match(archivo)
+        if not coincidencia:
+            continue
+        version, nombre = int(coincidencia.group(1)), coincidencia.group(2)
+        spec = importlib.util.spec_from_file_location(f"migracion_{version:04d}", os.path.join(directorio, archivo))
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        migraciones.append(Migracion(
+            version, nombre, list(modulo.SQL),
+            getattr(modulo, "TRANSACCION", True),
+            list(getattr(modulo, "VERIFICACIONES", [])),
+        ))
+
+    versiones = [m.version for m in migraciones]
+    if len(versiones) != len(set(versiones)):
+        raise ValueError("Hay dos migraciones con la misma versión.")
+    return migraciones
+
+
+def versiones_aplicadas(conn):
+    """Versiones ya aplicadas en el esquema actual, creando la tabla de control si falta."""
+    with conn.cursor() as cursor:
+        cursor.execute(TABLA_VERSIONES)
+        cursor.execute("SELECT version FROM schema_migraciones")
+        versiones = {fila[0] for fila in cursor.fetchall()}
+    conn.commit()
+    return versiones
+
+
+def _registrar_version(cursor, migracion, segundos):
+    cursor.execute(
+        "INSERT INTO schema_migraciones (version, nombre, segundos) VALUES (%s, %s, %s)",
+        (migracion.version, migracion.nombre, segundos),
+    )
+
+
+def aplicar(conn, hasta=None, salida=print):
+    """
+    Aplica en orden las migraciones pendientes.
+
+    Args:
+        conn: Conexión de psycopg2 (se respeta su search_path).
+        hasta (int, optional): Última versión a aplicar.
+        salida (callable, optional): Para informar el avance; None para no informar.
+
+    Returns:
+        list of Migracion: Las migraciones aplicadas.
+    """
+    aplicadas = versiones_aplicadas(conn)
+    pendientes = [m for m in cargar_migraciones()
+                  if m.version not in aplicadas and (hasta is None or m.version <= hasta)]
+
+    for migracion in pendientes:
+        inicio = time.perf_counter()
+        try:
+            if migracion.transaccion:
+                with conn.cursor() as cursor:
+                    for sentencia in migracion.sql:
+                        cursor.execute(sentencia)
+                    _registrar_version(cursor, migracion, time.perf_counter() - inicio)
+                conn.commit()
+            else:
+                conn.autocommit = True
+                try:
+                    with conn.cursor() as cursor:
+                        for sentencia in migracion.sql:
+                            cursor.execute(sentencia)
+                        _registrar_version(cursor, migracion, time.perf_counter() - inicio)
+                finally:
+                    conn.autocommit = False
+        except Exception:
+            if not conn.autocommit:
+                conn.rollback()
+            if salida:
+                salida(f"Falló la migración {migracion.version:04d} ({migracion.nombre}).")
+            raise
+        if salida:
+            salida(f"Aplicada {migracion.version:04d} {migracion.nombre} en {time.perf_counter() - inicio:.1f} s")
+    return pendientes
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def verificar_plan(conn, verificacion):
+    """
+    Hace EXPLAIN de la consulta y comprueba que lea la tabla por un índice.
+
+    Returns:
+        tuple: (bool o None si no hay datos para probar, descripción)
+    """
+    consulta = queries.obtener(verificacion.consulta)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(verificacion.parametros)
+            params = cursor.fetchone()
+            if params is None:
+                return None, "no hay datos para tomar parámetros"
+
+            cursor.execute(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = to_regclass(%s)", (verificacion.tabla,))
+            indices_tabla = {fila[0] for fila in cursor.fetchall()}
+
+            cursor.execute("EXPLAIN (FORMAT JSON) " + consulta.sql, params)
+            plan = cursor.fetchone()[0][0]["Plan"]
+    finally:
+        conn.rollback()
+
+    usados = sorted({n["Index Name"] for n in _nodos(plan)
+                     if n["Node Type"] in _NODOS_INDICE and n.get("Index Name") in indices_tabla})
+    if usados:
+        return True, f"{verificacion.tabla} por {', '.join(usados)}"
+    lecturas = sorted({n["Node Type"] for n in _nodos(plan) if n.get("Relation Name") == verificacion.tabla})
+    return False, f"{verificacion.tabla} sin índice ({', '.join(lecturas) or 'no aparece en el plan'})"
+
+
+def verificar(conn, migraciones=None):
+    """
+    Corre las verificaciones de las migraciones aplicadas.
+
+    Returns:
+        list of tuple: (Migracion, Verificacion, bool o None, descripción)
+    """
+    aplicadas = versiones_aplicadas(conn)
+    migraciones = cargar_migraciones() if migraciones is None else migraciones
+    resultados = []
+    for migracion in migraciones:
+        if migracion.version not in aplicadas:
+            continue
+        for verificacion in migracion.verificaciones:
+            ok, detalle = verificar_plan(conn, verificacion)
+            resultados.append((migracion, verificacion, ok, detalle))
+    return resultados
+
+
+def _conectar(dsn):
+    if dsn:
+        import psycopg2
+        return psycopg2.connect(dsn)
+    from db_pool import connect_to_supabase
+    return connect_to_supabase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="conexión a usar en lugar de SUPABASE_DB_*")
+    parser.add_argument("--hasta", type=int, help="aplicar solo hasta esta versión")
+    parser.add_argument("--estado", action="store_true", help="mostrar las versiones aplicadas y pendientes")
+    parser.add_argument("--verificar", action="store_true", help="comprobar los planes con EXPLAIN")
+    args = parser.parse_args()
+
+    conn = _conectar(args.dsn)
+    if conn is None:
+        sys.exit("No se pudo conectar a la base de datos.")
+
+    try:
+        if args.estado:
+            aplicadas = versiones_aplicadas(conn)
+            for migracion in cargar_migraciones():
+                marca = "aplicada " if migracion.version in aplicadas else "pendiente"
+                print(f"{migracion.version:04d}  {marca}  {migracion.nombre}")
+            return
+
+        if args.verificar:
+            fallas = 0
+            for migracion, verificacion, ok, detalle in verificar(conn):
+                marca = {True: "ok", False: "FALLA", None: "sin datos"}[ok]
+                print(f"{migracion.version:04d}  {verificacion.consulta:<28} {marca:<9} {detalle}")
+                fallas += ok is False
+            if fallas:
+                sys.exit(1)
+            return
+
+        if not aplicar(conn, hasta=args.hasta):
+            print("No hay migraciones pendientes.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
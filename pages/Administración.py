@@ -1,9 +1,8 @@
 import streamlit as st
-from psycopg2.extras import RealDictCursor
-from functions import get_connection, crear_logo
-from Inicio import manage_page_access
+from functions import mostrar_sidebar, insertar_paciente, insertar_medico, obtener_categorias, obtener_hospitales
+from functions import importar_pacientes
+from importacion import GRUPOS_SANGUINEOS
 import datetime
-# Función para conectarse a la base de datos
 
 st.set_page_config(
     page_title="SyncSalud - Administración",
@@ -11,69 +10,6 @@ st.set_page_config(
     layout="centered"
 )
 
-def insertar_paciente(dni, nombre_completo, obra_social, fecha_nacimiento,
-                      sexo, telefono, contacto_emergencia, grupo_sanguineo):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO PACIENTES (dni_paciente, nombre, obra_social, fecha_nacimiento,
-        sexo, telefono, contacto_emergencia, grupo_sanguineo)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """, (dni, nombre_completo, obra_social, fecha_nacimiento,
-          sexo, telefono, contacto_emergencia, grupo_sanguineo))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-
-
-# Función para insertar un médico
-def insertar_medico(nombre, licencia, id_hospital, id_categoria, dni):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO MEDICOS(nombre, licencia, id_hospital, id_categoria, dni)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id_medico
-    """, (nombre,licencia, id_hospital, id_categoria, dni))
-    id_medico = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
-    return id_medico
-
-def insertar_med_hosp(id_medico, id_hospital):
-    conn =get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSER INTO MEDICO_HOSPITAL(id_medico, id_hospital)
-        VALUES(%s, %s) RETURNING id_med_hosp
-    """, (id_medico, id_hospital))
-    id_med_hosp = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
-    return id_med_hosp
-
-# Función para obtener las categorías
-def obtener_categorias():
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("SELECT id_tipo_categoria, nombre_categoria FROM Categorias")
-    categorias = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [(c["id_tipo_categoria"], c['nombre_categoria']) for c in categorias]
-
-# Función para obtener los hospitales
-def obtener_hospitales():
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("SELECT id_hospital,nombre_hospital FROM Hospital")
-    hospitales = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [(h["id_hospital"], h['nombre_hospital']) for h in hospitales]
-
 #Esto es para que no accesa a la pagina si no es de admisiones
 
 if st.session_state.logged_in == False:
@@ -88,9 +24,9 @@ else:
         st.markdown("### ¿Qué desea agregar?")
 
 # Opción para elegir entre paciente o médico
-        opcion = st.radio("Seleccione qué desea agregar", ("Paciente", "Médico"))
+        opcion = st.radio("Seleccione qué desea agregar", ("Paciente", "Médico", "Importación masiva de pacientes"))
 
-        opciones_sangre = ["", "A+","A-", "B+","B-","AB+", "AB-","O+", "O-"]
+        opciones_sangre = [""] + list(GRUPOS_SANGUINEOS)
 
 # Formulario para agregar un paciente
         if opcion == "Paciente":
@@ -110,9 +46,11 @@ else:
         
                 submitted = st.form_submit_button("Agregar Paciente")
                 if submitted:
-                    insertar_paciente(dni, nombre_completo, obra_social, fecha_nacimiento,
-                              sexo, telefono, contacto_emergencia, grupo_sanguineo)
-                    st.success("Paciente agregado correctamente.")
+                    if insertar_paciente(dni, nombre_completo, obra_social, fecha_nacimiento,
+                              sexo, telefono, contacto_emergencia, grupo_sanguineo):
+                        st.success("Paciente agregado correctamente.")
+                    else:
+                        st.error("No se pudo agregar el paciente.")
 
 # Formulario para agregar un médico
         elif opcion == "Médico":
@@ -136,33 +74,56 @@ else:
 
                 submitted = st.form_submit_button("Agregar Médico")
                 if submitted:
-                    insertar_medico(nombre_apellido, numero_licencia,id_hospital, id_categoria, dni)
-                    st.success("Médico agregado correctamente")
+                    if insertar_medico(nombre_apellido, numero_licencia,id_hospital, id_categoria, dni) is not None:
+                        st.success("Médico agregado correctamente")
+                    else:
+                        st.error("No se pudo agregar el médico.")
+
+# Importación de pacientes desde CSV o Excel
+        elif opcion == "Importación masiva de pacientes":
+            st.markdown(
+                "El archivo debe tener encabezado con las columnas **dni_paciente**, **nombre**, "
+                "**fecha_nacimiento** y **sexo** (M, F u Otro); opcionalmente obra_social, telefono, "
+                "contacto_emergencia y grupo_sanguineo. Los DNI que ya existen se actualizan."
+            )
+            with st.form("Importar Pacientes"):
+                archivo = st.file_uploader("Archivo CSV o Excel", type=["csv", "xlsx"])
+                tamaño_lote = st.number_input("Filas por lote", min_value=500, max_value=50000, value=5000, step=500)
+                submitted = st.form_submit_button("Importar")
+
+            if submitted:
+                if archivo is None:
+                    st.warning("Seleccione un archivo.")
+                else:
+                    barra = st.progress(0.0, text="Importando...")
+                    total = getattr(archivo, "size", 0) or 1
+
+                    def mostrar_progreso(parcial):
+                        # El avance se estima por la posición de lectura en el archivo
+                        avance = min(archivo.tell() / total, 1.0) if hasattr(archivo, "tell") else 0.0
+                        barra.progress(avance, text=(
+                            f"{parcial['procesadas']} filas procesadas, "
+                            f"{parcial['con_error']} con errores"
+                        ))
+
+                    resultado = importar_pacientes(archivo, archivo.name, int(tamaño_lote), mostrar_progreso)
+                    barra.progress(1.0, text="Importación finalizada")
+
+                    if resultado['success']:
+                        st.success(resultado['message'])
+                    else:
+                        st.error(resultado['message'])
+
+                    if resultado['errores']:
+                        import pandas as pd
+                        st.markdown("#### Filas con errores")
+                        errores = pd.DataFrame(resultado['errores'], columns=["Fila", "DNI", "Motivo"])
+                        st.dataframe(errores)
+                        if resultado['con_error'] > len(resultado['errores']):
+                            st.caption(f"Se muestran los primeros {len(resultado['errores'])} de {resultado['con_error']} errores.")
+                        st.download_button("Descargar errores (CSV)", errores.to_csv(index=False), "errores_importacion.csv", "text/csv")
 
 
 if st.session_state.get("logged_in"):
     # Sidebar con información del usuario
-    with st.sidebar:
-        crear_logo()
-        st.markdown("---")
-        st.markdown(f"👤 Usuario: {st.session_state.username}")
-        st.markdown(f"👥 Rol: {st.session_state.rol}")
-        st.markdown("---")
-        
-        # Mostrar información sobre páginas accesibles
-        if st.session_state.rol == "Médico":
-            st.success("✅ Tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-            st.error("❌ No tienes acceso a: Administración")
-        elif st.session_state.rol == "Admisiones":
-            st.success("✅ Tienes acceso a: Administración")
-            st.error("❌ No tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-        
-        st.markdown("---")
-        if st.button("🚪 Cerrar sesión"):
-            # Restablecer estado y bloquear páginas
-            st.session_state.clear()
-            try:
-                manage_page_access()
-            except:
-                pass
-            st.rerun()
\ No newline at end of file
+    mostrar_sidebar()
@@ -1,8 +1,10 @@
 # --- Estudios.py ---
 import streamlit as st
-from functions import  execute_query, add_new_study
-from Inicio import manage_page_access
-from functions import crear_logo
+from functools import partial
+from functions import insertar_estudio, obtener_nombre_paciente, obtener_pagina_estudios
+from functions import TAMAÑOS_DE_PAGINA, iniciar_paginado, controles_paginado
+from functions import obtener_hospitales, obtener_categorias_estudio, obtener_estudios_por_categoria
+from functions import precargar, mostrar_sidebar
 from datetime import date
 
 st.set_page_config(
@@ -20,116 +22,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def obtener_nombre_por_dni(dni):
-    """
-    Obtiene el nombre del paciente por su DNI
-    """
-    query = "SELECT nombre FROM pacientes WHERE dni_paciente = %s"
-    resultado = execute_query(query, params=(dni,), is_select=True)
-    
-    if resultado.empty:
-        return None
-    
-    return resultado.iloc[0]['nombre']
-
-def obtener_estudios_por_dni(dni):
-    """
-    Obtiene todos los estudios de un paciente por DNI
-    """
-    query = """
-    SELECT 
-        er.fecha,
-        er.observaciones,
-        te.tipo_de_estudio AS categoria,
-        e.nombre_estudio AS estudio,
-        h.nombre_hospital AS hospital,
-        m.nombre AS medico
-    FROM estudios_realizados er
-    JOIN tipo_estudio te ON er.id_categoria_estudio = te.id_categoria_estudio
-    JOIN estudios e ON er.id_estudio = e.id_estudio
-    JOIN hospital h ON er.id_hospital = h.id_hospital
-    JOIN medicos m ON er.id_medico = m.id_medico
-    WHERE er.dni_paciente = %s
-    ORDER BY er.fecha DESC
-    """
-    
-    resultado = execute_query(query, params=(dni,), is_select=True)
-    
-    if resultado.empty:
-        return "Este paciente no posee estudios registrados."
-    
-    return resultado
-
-def obtener_pacientes():
-    """
-    Obtiene lista de pacientes con DNI y nombre
-    """
-    query = "SELECT dni_paciente, nombre FROM pacientes"
-    resultado = execute_query(query, is_select=True)
-    return [(row['dni_paciente'], row['nombre']) for _, row in resultado.iterrows()]
-
-def obtener_hospitales():
-    """
-    Obtiene lista de hospitales
-    """
-    query = "SELECT id_hospital, nombre_hospital FROM hospital"
-    resultado = execute_query(query, is_select=True)
-    return [(row['id_hospital'], row['nombre_hospital']) for _, row in resultado.iterrows()]
-
-def obtener_categorias_estudio():
-    """
-    Obtiene categorías de estudios
-    """
-    query = "SELECT id_categoria_estudio, tipo_de_estudio FROM tipo_estudio"
-    resultado = execute_query(query, is_select=True)
-    return [(row['id_categoria_estudio'], row['tipo_de_estudio']) for _, row in resultado.iterrows()]
-
-def obtener_estudios_por_categoria(categoria_id):
-    """
-    Obtiene estudios específicos por categoría
-    """
-    query = "SELECT id_estudio, nombre_estudio FROM estudios WHERE tipo_estudio = %s"
-    resultado = execute_query(query, params=(categoria_id,), is_select=True)
-    return [(row['id_estudio'], row['nombre_estudio']) for _, row in resultado.iterrows()]
-
-def obtener_id_medico_por_dni(dni):
-    """
-    Obtiene el ID del médico por su DNI
-    """
-    query = "SELECT id_medico FROM medicos WHERE dni = %s"
-    resultado = execute_query(query, params=(dni,), is_select=True)
-    
-    if resultado.empty:
-        return {
-            'success': False,
-            'id_medico': None,
-            'message': 'No se encontró ningún médico con ese DNI.'
-        }
-    
-    id_medico = int(resultado.iloc[0]['id_medico'])
-    return {
-        'success': True,
-        'id_medico': id_medico,
-        'message': 'ID del médico encontrado correctamente.'
-    }
-
-def insertar_estudio(dni_paciente, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones):
-    """
-    Inserta nuevo estudio en la base de datos
-    """
-    query = """
-        INSERT INTO estudios_realizados 
-        (dni_paciente, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
-    
-    try:
-        execute_query(query, params=(dni_paciente, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones))
-        return True
-    except Exception as e:
-        st.error(f"Error al insertar estudio: {str(e)}")
-        return False
-
 # -- INTERFAZ --
 
 if not st.session_state.get("logged_in", False):
@@ -145,8 +37,6 @@ else:
 
         if opcion == "📄 Ver estudios":
             # Inicializar variables de session_state para mantener el estado
-            if 'estudios_data' not in st.session_state:
-                st.session_state.estudios_data = None
             if 'nombre_paciente_actual' not in st.session_state:
                 st.session_state.nombre_paciente_actual = None
             if 'dni_paciente_actual' not in st.session_state:
@@ -154,6 +44,7 @@ else:
 
             with st.form("form_estudios"):
                 dni_paciente = st.text_input("🆔 DNI del paciente")
+                tamaño = st.selectbox("📄 Estudios por página", TAMAÑOS_DE_PAGINA, index=1)
                 btn_buscar = st.form_submit_button("🔍 Buscar estudios")
 
             if btn_buscar:
@@ -161,35 +52,27 @@ else:
                     st.warning("Por favor ingrese un DNI.")
                 else:
                     # Verificar si el paciente existe y obtener su nombre
-                    nombre_paciente = obtener_nombre_por_dni(dni_paciente.strip())
+                    nombre_paciente = obtener_nombre_paciente(dni_paciente.strip())
                     
                     if nombre_paciente is None:
                         st.error("❌ No se encontró ningún paciente con ese DNI")
                         st.info("💡 Verifique que el DNI esté correctamente ingresado")
                         # Limpiar datos anteriores
-                        st.session_state.estudios_data = None
+                        st.session_state.pop("estudios_paginado", None)
                         st.session_state.nombre_paciente_actual = None
                         st.session_state.dni_paciente_actual = None
                     else:
-                        # Obtener estudios del paciente
-                        df_estudios = obtener_estudios_por_dni(dni_paciente.strip())
-                        
-                        if isinstance(df_estudios, str):
-                            st.success(f"✅ Paciente encontrado: **{nombre_paciente}**")
-                            st.info(df_estudios)
-                            # Limpiar datos de estudios pero mantener info del paciente
-                            st.session_state.estudios_data = None
-                            st.session_state.nombre_paciente_actual = nombre_paciente
-                            st.session_state.dni_paciente_actual = dni_paciente.strip()
-                        else:
-                            # Guardar datos en session_state
-                            st.session_state.estudios_data = df_estudios
-                            st.session_state.nombre_paciente_actual = nombre_paciente
-                            st.session_state.dni_paciente_actual = dni_paciente.strip()
+                        # Solo la primera página; el resto se pide con "Cargar más"
+                        iniciar_paginado("estudios_paginado", obtener_pagina_estudios(dni_paciente.strip(), tamaño))
+                        st.session_state.nombre_paciente_actual = nombre_paciente
+                        st.session_state.dni_paciente_actual = dni_paciente.strip()
+
+            estado = st.session_state.get("estudios_paginado")
 
             # Mostrar resultados si hay datos en session_state
-            if st.session_state.estudios_data is not None and not st.session_state.estudios_data.empty:
-                df_estudios = st.session_state.estudios_data
+            if estado is not None and not estado['filas'].empty:
+                # El DataFrame de la página tal como salió de la base (Arrow en modo columnar)
+                df_estudios = estado['filas']
                 nombre_paciente = st.session_state.nombre_paciente_actual
                 dni_paciente = st.session_state.dni_paciente_actual
 
@@ -217,8 +100,8 @@ else:
                     categorias_unicas = ["Todos"] + sorted(df_estudios['categoria'].unique().tolist())
                     categoria_filtro = st.selectbox("🔬 Tipo de Estudio:", categorias_unicas, key="categoria_filter")
                 
-                # Aplicar filtros
-                df_filtrado = df_estudios.copy()
+                # Aplicar filtros sobre las páginas ya cargadas
+                df_filtrado = df_estudios
                 
                 if hospital_filtro != "Todos":
                     df_filtrado = df_filtrado[df_filtrado['hospital'] == hospital_filtro]
@@ -233,11 +116,12 @@ else:
                 
                 if not df_filtrado.empty:
                     # Mostrar tabla resumen
-                    st.subheader(f"📊 Estudios Encontrados ({len(df_filtrado)} de {len(df_estudios)})")
+                    st.subheader(f"📊 Estudios Encontrados ({len(df_filtrado)} de {len(df_estudios)} cargados)")
                     st.dataframe(df_filtrado[["fecha", "categoria", "estudio", "hospital"]])
 
+                    # Los detalles se muestran solo para la última página cargada
                     st.markdown("### 🗂️ Detalles adicionales por estudio")
-                    for idx, row in df_filtrado.iterrows():
+                    for idx, row in df_filtrado[df_filtrado.index >= estado['desde']].iterrows():
                         with st.expander(f"🗓 {row['fecha']} | {row['estudio']}"):
                             st.write(f"🔬 Tipo de estudio: {row['categoria']}")
                             st.write(f"📋 Estudio: {row['estudio']}")
@@ -249,7 +133,9 @@ else:
                     st.warning("🔍 No se encontraron estudios con los filtros aplicados")
                     st.info("💡 Intente modificar los filtros para ver más resultados")
 
-            elif st.session_state.nombre_paciente_actual and st.session_state.estudios_data is None:
+                controles_paginado("estudios_paginado", partial(obtener_pagina_estudios, dni_paciente), tamaño)
+
+            elif st.session_state.nombre_paciente_actual and estado is not None:
                 # Caso donde se encontró el paciente pero no tiene estudios
                 st.success(f"✅ Paciente encontrado: **{st.session_state.nombre_paciente_actual}**")
                 st.info("Este paciente no posee estudios registrados.")
@@ -257,13 +143,11 @@ else:
         elif opcion == "➕ Agregar estudio":
             st.title("➕ Nuevo estudio médico")
             
-            # Obtener ID del médico logueado
-            dni_medico = st.session_state.dni
-            buscar_id_medico = obtener_id_medico_por_dni(dni_medico)
-            id_medico = buscar_id_medico["id_medico"]
+            # ID del médico logueado, resuelto al iniciar sesión
+            id_medico = st.session_state.get("id_medico")
             
             # Mostrar información del médico
-            if buscar_id_medico["success"]:
+            if id_medico is not None:
                 st.info(f"👨‍⚕ Médico: {st.session_state.username} (ID: {id_medico})")
             else:
                 st.error("No se pudo obtener la información del médico logueado")
@@ -275,7 +159,10 @@ else:
             # Verificación automática del paciente cuando se ingresa DNI
             nombre_paciente_encontrado = None
             if dni_paciente_input.strip():
-                nombre_paciente_encontrado = obtener_nombre_por_dni(dni_paciente_input.strip())
+                # Paciente y catálogos del formulario en un solo viaje, solo lo
+                # que no está ya en las cachés compartidas
+                precargar(dni_paciente_input.strip(), ("hospitales", "tipos_estudio"))
+                nombre_paciente_encontrado = obtener_nombre_paciente(dni_paciente_input.strip())
                 if nombre_paciente_encontrado:
                     st.success(f"👤 Paciente: **{nombre_paciente_encontrado}**")
                 else:
@@ -285,20 +172,17 @@ else:
             if nombre_paciente_encontrado:
                 col1, col2 = st.columns(2)
                 
-                # Cargar datos solo una vez y cachearlos
-                if 'hospitales_fast' not in st.session_state:
-                    st.session_state.hospitales_fast = obtener_hospitales()
-                
-                if 'categorias_fast' not in st.session_state:
-                    st.session_state.categorias_fast = obtener_categorias_estudio()
+                # Los catálogos vienen de la caché compartida del proceso
+                hospitales = obtener_hospitales()
+                categorias = obtener_categorias_estudio()
                 
                 with col1:
                     # Selector de hospital
-                    opciones_hosp = [f"{id_h} - {nombre}" for id_h, nombre in st.session_state.hospitales_fast]
+                    opciones_hosp = [f"{id_h} - {nombre}" for id_h, nombre in hospitales]
                     hospital_sel = st.selectbox("🏥 Hospital", opciones_hosp, key="hospital_fast")
                     
                     # Selector de categoría
-                    opciones_cat = [f"{id_c} - {nombre}" for id_c, nombre in st.session_state.categorias_fast]
+                    opciones_cat = [f"{id_c} - {nombre}" for id_c, nombre in categorias]
                     categoria_sel = st.selectbox("📚 Tipo de estudio", opciones_cat, key="categoria_fast")
 
                 with col2:
@@ -306,13 +190,7 @@ else:
                     estudio_sel = None
                     if categoria_sel:
                         id_categoria = int(categoria_sel.split(" - ")[0])
-                        
-                        # Cache rápido para estudios por categoría
-                        cache_key = f"estudios_fast_{id_categoria}"
-                        if cache_key not in st.session_state:
-                            st.session_state[cache_key] = obtener_estudios_por_categoria(id_categoria)
-                        
-                        estudios_especificos = st.session_state[cache_key]
+                        estudios_especificos = obtener_estudios_por_categoria(id_categoria)
                         
                         if estudios_especificos:
                             opciones_estudios = [f"{id_e} - {nombre}" for id_e, nombre in estudios_especificos]
@@ -341,19 +219,19 @@ else:
                         id_categoria_estudio = int(categoria_sel.split(" - ")[0])
                         id_estudio = int(estudio_sel.split(" - ")[0])
 
-                        # Usar función rápida y directa
-                        success = add_new_study(
+                        # Una sola sentencia por el pool; la clave foránea valida al paciente
+                        estudio = insertar_estudio(
                             dni_paciente=dni_paciente,
-                            doctor_id=id_medico,
-                            hospital_id=id_hospital,
+                            id_medico=id_medico,
+                            id_hospital=id_hospital,
                             id_categoria_estudio=id_categoria_estudio,
-                            estudio_id=id_estudio,
-                            study_date=fecha_estudio,
-                            observations=observaciones
+                            id_estudio=id_estudio,
+                            fecha=fecha_estudio,
+                            observaciones=observaciones
                         )
                         
-                        if success:
-                            st.success("✅ Estudio médico agregado correctamente.")
+                        if estudio is not None:
+                            st.success(f"✅ Estudio médico agregado correctamente (N.º {estudio['id_estudio_realizado']}).")
                             # Limpiar solo los campos necesarios
                             st.rerun()
                         else:
@@ -379,27 +257,4 @@ else:
 
 # Sidebar con información del usuario
 if st.session_state.get("logged_in"):
-    with st.sidebar:
-        crear_logo()
-        st.markdown("---")
-        st.markdown(f"👤 Usuario: {st.session_state.username}")
-        st.markdown(f"👥 Rol: {st.session_state.rol}")
-        st.markdown("---")
-        
-        # Mostrar información sobre páginas accesibles
-        if st.session_state.rol == "Médico":
-            st.success("✅ Tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-            st.error("❌ No tienes acceso a: Administración")
-        elif st.session_state.rol == "Admisiones":
-            st.success("✅ Tienes acceso a: Administración")
-            st.error("❌ No tienes acceso a: Consultas médicas, Estudios y Medicamentos")
-        
-        st.markdown("---")
-        if st.button("🚪 Cerrar sesión"):
-            # Restablecer estado y bloquear páginas
-            st.session_state.clear()
-            try:
-                manage_page_access()
-            except:
-                pass
-            st.rerun()
\ No newline at end of file
+    mostrar_sidebar()
@@ -0,0 +1,578 @@
+from collections import namedtuple
+
+# Registro central de consultas SQL: cada consulta tiene un único nombre y una
+# única definición. Las marcadas con preparar=True se ejecutan como sentencias
+# preparadas del lado del servidor (ver functions.ejecutar_consulta).
+ConsultaSQL = namedtuple("ConsultaSQL", ["nombre", "sql", "preparar", "escritura"])
+
+QUERIES = {}
+
+
+def registrar(nombre, sql, preparar=False, escritura=False):
+    """
+    Registra una consulta con nombre. Falla si el nombre ya existe.
+
+    Args:
+        nombre (str): Identificador de la consulta (snake_case, sin espacios).
+        sql (str): SQL con parámetros posicionales %s.
+        preparar (bool, optional): Ejecutarla como sentencia preparada.
+        escritura (bool, optional): Es INSERT/UPDATE/DELETE y requiere commit.
+
+    Returns:
+        ConsultaSQL: La consulta registrada.
+    """
+    if nombre in QUERIES:
+        raise ValueError(f"La consulta '{nombre}' ya está registrada.")
+    consulta = ConsultaSQL(nombre, sql.strip(), preparar, escritura)
+    QUERIES[nombre] = consulta
+    return consulta
+
+
+def obtener(nombre):
+    """Devuelve la consulta registrada con ese nombre."""
+    try:
+        return QUERIES[nombre]
+    except KeyError:
+        raise KeyError(f"No existe una consulta registrada como '{nombre}'.") from None
+
+
+def a_parametros_numerados(sql):
+    """
+    Convierte los %s de psycopg2 en $1, $2, ... para usar el SQL en un PREPARE.
+
+    Returns:
+        tuple: (sql convertido, cantidad de parámetros)
+    """
+    partes = []
+    n = 0
+    i = 0
+    while i < len(sql):
+        if sql.startswith("%%", i):
+            partes.append("%")
+            i += 2
+        elif sql.startswith("%s", i):
+            n += 1
+            partes.append(f"${n}")
+            i += 2
+        else:
+            partes.append(sql[i])
+            i += 1
+    return "".join(partes), n
+
+
+# --- Usuarios ---
+
+# Inicio de sesión: credenciales, rol y, si es médico, su ficha en un solo viaje
+registrar("login", """
+    SELECT u.id AS dni, u.contraseña, u.rol,
+           m.id_medico, m.id_hospital, m.id_categoria, m.nombre
+    FROM users u
+    LEFT JOIN medicos m ON m.dni = u.id
+    WHERE u.nombre_usuario = %s
+    LIMIT 1
+""", preparar=True)
+
+registrar("usuario_existe_por_dni", """
+    SELECT COUNT(*) AS total FROM users WHERE id = %s
+""")
+
+registrar("usuario_existe_por_nombre", """
+    SELECT COUNT(*) AS total FROM users WHERE nombre_usuario = %s
+""")
+
+registrar("insertar_usuario", """
+    INSERT INTO users (id, nombre_usuario, contraseña, rol)
+    VALUES (%s, %s, %s, %s)
+""", escritura=True)
+
+# --- Médicos ---
+
+registrar("medico_por_dni", """
+    SELECT id_medico, nombre, id_hospital, id_categoria FROM medicos WHERE dni = %s
+""", preparar=True)
+
+registrar("medico_existe", """
+    SELECT COUNT(*) AS total FROM medicos WHERE dni = %s
+""")
+
+registrar("insertar_medico", """
+    INSERT INTO medicos (nombre, licencia, id_hospital, id_categoria, dni)
+    VALUES (%s, %s, %s, %s, %s) RETURNING id_medico
+""", escritura=True)
+
+# --- Pacientes ---
+
+registrar("paciente_por_dni", """
+    SELECT dni_paciente, nombre FROM pacientes WHERE dni_paciente = %s
+""", preparar=True)
+
+# Datos personales más el resumen de su historia (paciente_resumen, ver
+# migraciones/0004_paciente_resumen.py). `desactualizado` avisa que pasó la
+# fecha en que cambiaban la gravedad reciente o la medicación vigente.
+registrar("datos_paciente", """
+    SELECT p.nombre, p.sexo, p.fecha_nacimiento, p.grupo_sanguineo, p.obra_social,
+           p.telefono, p.contacto_emergencia, p.altura, p.peso,
+           r.consultas, r.ultima_consulta, r.gravedad_max_reciente,
+           r.medicacion_activa, r.estudios, r.ultimo_estudio,
+           coalesce(r.vigente_hasta <= current_date, false) AS desactualizado
+    FROM pacientes p
+    LEFT JOIN paciente_resumen r ON r.dni_paciente = p.dni_paciente
+    WHERE p.dni_paciente = %s
+""", preparar=True)
+
+# Parámetro: lista de DNI (la función agrega también los que no tenían resumen)
+registrar("recalcular_resumen_pacientes", """
+    SELECT recalcular_paciente_resumen(%s::varchar[]) AS recalculados
+""", escritura=True)
+
+# Búsqueda incremental de pacientes: prefijo de DNI o parte del nombre.
+# La sostienen un índice text_pattern_ops sobre el DNI y uno de trigramas
+# (pg_trgm) sobre el nombre: ver migraciones/0002_indices_de_busqueda.py.
+# Parámetros: prefijo de DNI, texto del nombre, prefijo de DNI, límite
+registrar("buscar_pacientes", """
+    SELECT p.dni_paciente, p.nombre, r.consultas, r.ultima_consulta
+    FROM pacientes p
+    LEFT JOIN paciente_resumen r ON r.dni_paciente = p.dni_paciente
+    WHERE p.dni_paciente LIKE %s || '%%'
+       OR p.nombre ILIKE '%%' || %s || '%%'
+    ORDER BY (p.dni_paciente LIKE %s || '%%') DESC, p.nombre
+    LIMIT %s
+""", preparar=True)
+
+# Últimos pacientes atendidos por un médico (consultas, estudios o recetas).
+# Parámetros: id_medico, id_medico, id_medico, límite
+registrar("pacientes_recientes_medico", """
+    SELECT p.dni_paciente, p.nombre, max(r.fecha) AS ultima_atencion,
+           pr.consultas, pr.ultima_consulta
+    FROM (
+        SELECT id_paciente AS dni, fecha_consulta AS fecha
+        FROM consulta_medica WHERE id_medico = %s
+        UNION ALL
+        SELECT dni_paciente, fecha
+        FROM estudios_realizados WHERE id_medico = %s
+        UNION ALL
+        SELECT id_paciente, fecha_inicio_medicamento
+        FROM medicamento_recetado WHERE id_medico = %s
+    ) r
+    JOIN pacientes p ON p.dni_paciente = r.dni
+    LEFT JOIN paciente_resumen pr ON pr.dni_paciente = p.dni_paciente
+    GROUP BY p.dni_paciente, p.nombre, pr.consultas, pr.ultima_consulta
+    ORDER BY ultima_atencion DESC
+    LIMIT %s
+""", preparar=True)
+
+registrar("insertar_paciente", """
+    INSERT INTO pacientes (dni_paciente, nombre, obra_social, fecha_nacimiento,
+                           sexo, telefono, contacto_emergencia, grupo_sanguineo)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+""", escritura=True)
+
+# Importación masiva de pacientes (ver importacion.py). Cada lote se copia con
+# COPY a una tabla temporal que desaparece al hacer commit y desde ahí se hace
+# el upsert; si un DNI se repite en el lote gana la última fila del archivo.
+registrar("importacion_pacientes_staging", """
+    CREATE TEMP TABLE pacientes_importacion (
+        fila integer NOT NULL,
+        LIKE pacientes INCLUDING DEFAULTS
+    ) ON COMMIT DROP
+""")
+
+registrar("importacion_pacientes_copy", """
+    COPY pacientes_importacion (fila, dni_paciente, nombre, obra_social, fecha_nacimiento,
+                                sexo, telefono, contacto_emergencia, grupo_sanguineo)
+    FROM STDIN WITH (FORMAT csv)
+""")
+
+registrar("importacion_pacientes_upsert", """
+    INSERT INTO pacientes (dni_paciente, nombre, obra_social, fecha_nacimiento,
+                           sexo, telefono, contacto_emergencia, grupo_sanguineo)
+    SELECT DISTINCT ON (dni_paciente)
+           dni_paciente, nombre, obra_social, fecha_nacimiento,
+           sexo, telefono, contacto_emergencia, grupo_sanguineo
+    FROM pacientes_importacion
+    ORDER BY dni_paciente, fila DESC
+    ON CONFLICT (dni_paciente) DO UPDATE SET
+        nombre = EXCLUDED.nombre,
+        obra_social = EXCLUDED.obra_social,
+        fecha_nacimiento = EXCLUDED.fecha_nacimiento,
+        sexo = EXCLUDED.sexo,
+        telefono = EXCLUDED.telefono,
+        contacto_emergencia = EXCLUDED.contacto_emergencia,
+        grupo_sanguineo = EXCLUDED.grupo_sanguineo
+    RETURNING (xmax = 0) AS insertado
+""", escritura=True)
+
+# --- Catálogos ---
+
+registrar("hospitales", """
+    SELECT id_hospital, nombre_hospital FROM hospital
+""")
+
+registrar("categorias", """
+    SELECT id_tipo_categoria, nombre_categoria FROM categorias
+""")
+
+registrar("tipos_estudio", """
+    SELECT id_categoria_estudio, tipo_de_estudio FROM tipo_estudio
+""")
+
+registrar("estudios_por_categoria", """
+    SELECT id_estudio, nombre_estudio FROM estudios WHERE tipo_estudio = %s
+""", preparar=True)
+
+registrar("medicamentos", """
+    SELECT id_medicamento, nombre FROM medicamentos
+""")
+
+# --- Etiquetas de tablas de referencia (id -> nombre, en lote) ---
+
+registrar("etiquetas_tipo_medicamento", """
+    SELECT id_tipo_med AS id, tipo_de_medicamento AS etiqueta
+    FROM tipo_medicamento WHERE id_tipo_med = ANY(%s)
+""")
+
+registrar("etiquetas_categorias", """
+    SELECT id_tipo_categoria AS id, nombre_categoria AS etiqueta
+    FROM categorias WHERE id_tipo_categoria = ANY(%s)
+""")
+
+registrar("etiquetas_hospital", """
+    SELECT id_hospital AS id, nombre_hospital AS etiqueta
+    FROM hospital WHERE id_hospital = ANY(%s)
+""")
+
+registrar("etiquetas_medicos", """
+    SELECT id_medico AS id, nombre AS etiqueta
+    FROM medicos WHERE id_medico = ANY(%s)
+""")
+
+# --- Consultas médicas ---
+
+# Historial paginado por keyset sobre (clasificacion, fecha_consulta, id_consulta):
+# la primera página no lleva cursor; las siguientes parten de la última fila vista.
+_HISTORIAL_PAGINA = """
+    SELECT
+        cm.id_consulta,
+        cm.detalle_consulta,
+        cm.clasificacion AS gravedad,
+        cm.fecha_consulta,
+        h.nombre_hospital AS hospital,
+        c.nombre_categoria AS especialidad,
+        m.nombre AS medico
+    FROM consulta_medica cm
+    JOIN hospital h ON h.id_hospital = cm.id_hospital
+    JOIN categorias c ON c.id_tipo_categoria = cm.id_categoria
+    JOIN medicos m ON m.id_medico = cm.id_medico
+    WHERE cm.id_paciente = %s
+"""
+
+registrar("historial_pagina", _HISTORIAL_PAGINA + """
+    ORDER BY cm.clasificacion DESC, cm.fecha_consulta DESC, cm.id_consulta DESC
+    LIMIT %s
+""", preparar=True)
+
+registrar("historial_pagina_despues", _HISTORIAL_PAGINA + """
+      AND (cm.clasificacion, cm.fecha_consulta, cm.id_consulta) < (%s, %s, %s)
+    ORDER BY cm.clasificacion DESC, cm.fecha_consulta DESC, cm.id_consulta DESC
+    LIMIT %s
+""", preparar=True)
+
+registrar("insertar_consulta", """
+    INSERT INTO consulta_medica (id_paciente, id_medico, id_hospital, id_categoria,
+                                 clasificacion, detalle_consulta, fecha_consulta)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+""", escritura=True)
+
+# --- Estudios ---
+
+# Estudios paginados por keyset sobre (fecha, id_estudio_realizado)
+_ESTUDIOS_PAGINA = """
+    SELECT
+        er.id_estudio_realizado,
+        er.fecha,
+        er.observaciones,
+        te.tipo_de_estudio AS categoria,
+        e.nombre_estudio AS estudio,
+        h.nombre_hospital AS hospital,
+        m.nombre AS medico
+    FROM estudios_realizados er
+    JOIN tipo_estudio te ON er.id_categoria_estudio = te.id_categoria_estudio
+    JOIN estudios e ON er.id_estudio = e.id_estudio
+    JOIN hospital h ON er.id_hospital = h.id_hospital
+    JOIN medicos m ON er.id_medico = m.id_medico
+    WHERE er.dni_paciente = %s
+"""
+
+registrar("estudios_pagina", _ESTUDIOS_PAGINA + """
+    ORDER BY er.fecha DESC, er.id_estudio_realizado DESC
+    LIMIT %s
+""", preparar=True)
+
+registrar("estudios_pagina_despues", _ESTUDIOS_PAGINA + """
+      AND (er.fecha, er.id_estudio_realizado) < (%s, %s)
+    ORDER BY er.fecha DESC, er.id_estudio_realizado DESC
+    LIMIT %s
+""", preparar=True)
+
+# Un solo viaje a la base: si el paciente no existe la clave foránea rechaza la fila
+registrar("insertar_estudio", """
+    INSERT INTO estudios_realizados
+        (dni_paciente, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    RETURNING id_estudio_realizado, dni_paciente, id_medico, id_hospital,
+              id_categoria_estudio, id_estudio, fecha, observaciones
+""", escritura=True)
+
+# --- Medicación ---
+
+registrar("medicacion_actual", """
+    SELECT m.nombre AS nombre_medicamento, m.tipo AS tipo_medicamento,
+           mr.indicaciones, mr.fecha_inicio_medicamento, mr.fecha_terminacion_medicamento
+    FROM medicamento_recetado mr
+    JOIN medicamentos m ON mr.id_medicamento = m.id_medicamento
+    WHERE mr.id_paciente = %s
+      AND (mr.fecha_terminacion_medicamento IS NULL OR mr.fecha_terminacion_medicamento >= %s)
+      AND mr.fecha_inicio_medicamento <= %s
+    ORDER BY mr.fecha_inicio_medicamento DESC
+""", preparar=True)
+
+registrar("medicacion_anterior", """
+    SELECT m.nombre AS nombre_medicamento, m.tipo AS tipo_medicamento,
+           mr.indicaciones, mr.fecha_inicio_medicamento, mr.fecha_terminacion_medicamento
+    FROM medicamento_recetado mr
+    JOIN medicamentos m ON mr.id_medicamento = m.id_medicamento
+    WHERE mr.id_paciente = %s
+      AND mr.fecha_terminacion_medicamento < %s
+    ORDER BY mr.fecha_terminacion_medicamento DESC
+""", preparar=True)
+
+registrar("insertar_medicamento_recetado", """
+    INSERT INTO medicamento_recetado
+        (id_paciente, id_medico, id_medicamento, indicaciones,
+         fecha_inicio_medicamento, fecha_terminacion_medicamento)
+    VALUES (%s, %s, %s, %s, %s, %s)
+""", escritura=True)
+
+# Receta completa en una sola sentencia multi-fila: el único %s de VALUES lo
+# expande execute_values (ver functions.ejecutar_lote), así que no se prepara.
+registrar("insertar_receta", """
+    INSERT INTO medicamento_recetado
+        (id_paciente, id_medico, id_medicamento, indicaciones,
+         fecha_inicio_medicamento, fecha_terminacion_medicamento)
+    VALUES %s
+    RETURNING id_medicamento_recetado
+""", escritura=True)
+
+# --- Historial completo ---
+
+# Historial del paciente en un solo viaje, agregado como JSON: datos personales
+# con su resumen (como datos_paciente), medicación vigente y anterior, y la
+# primera página de estudios y de consultas (con una fila de más, como
+# estudios_pagina e historial_pagina, para saber si hay otra).
+# Parámetros: dni, dni, fecha, fecha, dni, fecha, dni, límite, dni, límite
+registrar("linea_de_tiempo_paciente", """
+    SELECT json_build_object(
+        'datos', (
+            SELECT row_to_json(x)
+            FROM (
+                SELECT p.nombre, p.sexo, p.fecha_nacimiento, p.grupo_sanguineo, p.obra_social,
+                       p.telefono, p.contacto_emergencia, p.altura, p.peso,
+                       r.consultas, r.ultima_consulta, r.gravedad_max_reciente,
+                       r.medicacion_activa, r.estudios, r.ultimo_estudio,
+                       coalesce(r.vigente_hasta <= current_date, false) AS desactualizado
+                FROM pacientes p
+                LEFT JOIN paciente_resumen r ON r.dni_paciente = p.dni_paciente
+                WHERE p.dni_paciente = %s
+            ) x
+        ),
+        'medicacion_actual', COALESCE((
+            SELECT json_agg(x ORDER BY x.fecha_inicio_medicamento DESC)
+            FROM (
+                SELECT m.nombre AS nombre_medicamento, m.tipo AS tipo_medicamento,
+                       coalesce(tm.tipo_de_medicamento, 'No se encontro tipo de medicamento')
+                           AS tipo_de_medicamento,
+                       mr.indicaciones, mr.fecha_inicio_medicamento, mr.fecha_terminacion_medicamento
+                FROM medicamento_recetado mr
+                JOIN medicamentos m ON mr.id_medicamento = m.id_medicamento
+                LEFT JOIN tipo_medicamento tm ON tm.id_tipo_med = m.tipo
+                WHERE mr.id_paciente = %s
+                  AND (mr.fecha_terminacion_medicamento IS NULL OR mr.fecha_terminacion_medicamento >= %s)
+                  AND mr.fecha_inicio_medicamento <= %s
+            ) x
+        ), '[]'::json),
+        'medicacion_anterior', COALESCE((
+            SELECT json_agg(x ORDER BY x.fecha_terminacion_medicamento DESC)
+            FROM (
+                SELECT m.nombre AS nombre_medicamento, m.tipo AS tipo_medicamento,
+                       coalesce(tm.tipo_de_medicamento, 'No se encontro tipo de medicamento')
+                           AS tipo_de_medicamento,
+                       mr.indicaciones, mr.fecha_inicio_medicamento, mr.fecha_terminacion_medicamento
+                FROM medicamento_recetado mr
+                JOIN medicamentos m ON mr.id_medicamento = m.id_medicamento
+                LEFT JOIN tipo_medicamento tm ON tm.id_tipo_med = m.tipo
+                WHERE mr.id_paciente = %s
+                  AND mr.fecha_terminacion_medicamento < %s
+            ) x
+        ), '[]'::json),
+        'estudios', COALESCE((
+            SELECT json_agg(x ORDER BY x.fecha DESC, x.id_estudio_realizado DESC)
+            FROM (""" + _ESTUDIOS_PAGINA + """
+                ORDER BY er.fecha DESC, er.id_estudio_realizado DESC
+                LIMIT %s
+            ) x
+        ), '[]'::json),
+        'consultas', COALESCE((
+            SELECT json_agg(x ORDER BY x.gravedad DESC, x.fecha_consulta DESC, x.id_consulta DESC)
+            FROM (""" + _HISTORIAL_PAGINA + """
+                ORDER BY cm.clasificacion DESC, cm.fecha_consulta DESC, cm.id_consulta DESC
+                LIMIT %s
+            ) x
+        ), '[]'::json)
+    ) AS linea_de_tiempo
+""", preparar=True)
+
+# --- Exportaciones en bloques (ver functions.ejecutar_consulta_en_bloques) ---
+
+registrar("exportacion_consultas", """
+    SELECT cm.id_consulta, cm.id_paciente AS dni_paciente, cm.fecha_consulta,
+           cm.clasificacion AS gravedad, cm.detalle_consulta,
+           h.nombre_hospital AS hospital, c.nombre_categoria AS especialidad,
+           m.nombre AS medico
+    FROM consulta_medica cm
+    JOIN hospital h ON h.id_hospital = cm.id_hospital
+    JOIN categorias c ON c.id_tipo_categoria = cm.id_categoria
+    JOIN medicos m ON m.id_medico = cm.id_medico
+    ORDER BY cm.id_consulta
+""")
+
+registrar("exportacion_estudios", """
+    SELECT er.id_estudio_realizado, er.dni_paciente, er.fecha,
+           te.tipo_de_estudio AS categoria, e.nombre_estudio AS estudio,
+           h.nombre_hospital AS hospital, m.nombre AS medico, er.observaciones
+    FROM estudios_realizados er
+    JOIN tipo_estudio te ON te.id_categoria_estudio = er.id_categoria_estudio
+    JOIN estudios e ON e.id_estudio = er.id_estudio
+    JOIN hospital h ON h.id_hospital = er.id_hospital
+    JOIN medicos m ON m.id_medico = er.id_medico
+    ORDER BY er.id_estudio_realizado
+""")
+
+# --- Intercambio FHIR (ver fhir.py) ---
+
+# Exportación: se leen con cursores del lado del servidor; el dni es opcional
+# (NULL exporta todos los pacientes).
+registrar("fhir_pacientes", """
+    SELECT dni_paciente, nombre, sexo, fecha_nacimiento, telefono, obra_social,
+           contacto_emergencia, grupo_sanguineo
+    FROM pacientes
+    WHERE %s::varchar IS NULL OR dni_paciente = %s
+    ORDER BY dni_paciente
+""")
+
+registrar("fhir_consultas", """
+    SELECT cm.id_consulta, cm.id_paciente, cm.fecha_consulta, cm.clasificacion,
+           cm.detalle_consulta, h.nombre_hospital, c.nombre_categoria,
+           m.nombre AS medico, m.dni AS dni_medico
+    FROM consulta_medica cm
+    JOIN hospital h ON h.id_hospital = cm.id_hospital
+    JOIN categorias c ON c.id_tipo_categoria = cm.id_categoria
+    JOIN medicos m ON m.id_medico = cm.id_medico
+    WHERE %s::varchar IS NULL OR cm.id_paciente = %s
+    ORDER BY cm.id_consulta
+""")
+
+registrar("fhir_estudios", """
+    SELECT er.id_estudio_realizado, er.dni_paciente, er.fecha, er.observaciones,
+           te.tipo_de_estudio, e.nombre_estudio, h.nombre_hospital,
+           m.nombre AS medico, m.dni AS dni_medico
+    FROM estudios_realizados er
+    JOIN tipo_estudio te ON te.id_categoria_estudio = er.id_categoria_estudio
+    JOIN estudios e ON e.id_estudio = er.id_estudio
+    JOIN hospital h ON h.id_hospital = er.id_hospital
+    JOIN medicos m ON m.id_medico = er.id_medico
+    WHERE %s::varchar IS NULL OR er.dni_paciente = %s
+    ORDER BY er.id_estudio_realizado
+""")
+
+registrar("fhir_recetas", """
+    SELECT mr.id_medicamento_recetado, mr.id_paciente, mr.indicaciones,
+           mr.fecha_inicio_medicamento, mr.fecha_terminacion_medicamento,
+           md.nombre AS medicamento, m.nombre AS medico, m.dni AS dni_medico
+    FROM medicamento_recetado mr
+    JOIN medicamentos md ON md.id_medicamento = mr.id_medicamento
+    JOIN medicos m ON m.id_medico = mr.id_medico
+    WHERE %s::varchar IS NULL OR mr.id_paciente = %s
+    ORDER BY mr.id_medicamento_recetado
+""")
+
+# Importación: mapas de tablas de referencia, se cargan una vez por importación
+registrar("fhir_mapa_estudios", """
+    SELECT e.id_estudio, e.nombre_estudio, e.tipo_estudio AS id_categoria_estudio, te.tipo_de_estudio
+    FROM estudios e
+    JOIN tipo_estudio te ON te.id_categoria_estudio = e.tipo_estudio
+""")
+
+registrar("fhir_mapa_medicos", """
+    SELECT dni, id_medico FROM medicos
+""")
+
+# Inserciones por lote con execute_values. Las filas cuyo paciente no existe
+# se descartan en el JOIN; RETURNING permite contar cuántas entraron.
+registrar("fhir_insertar_pacientes", """
+    INSERT INTO pacientes (dni_paciente, nombre, obra_social, fecha_nacimiento,
+                           sexo, telefono, contacto_emergencia, grupo_sanguineo)
+    SELECT v.dni, v.nombre, v.obra_social, v.fecha_nacimiento::date,
+           v.sexo, v.telefono, v.contacto_emergencia, v.grupo_sanguineo
+    FROM (VALUES %s) AS v(dni, nombre, obra_social, fecha_nacimiento,
+                          sexo, telefono, contacto_emergencia, grupo_sanguineo)
+    ON CONFLICT (dni_paciente) DO NOTHING
+    RETURNING 1
+""", escritura=True)
+
+# Consultas, estudios y recetas traen el identificador del recurso en su
+# sistema de origen: se anota en fhir_importados junto con el id que se le
+# reserva a la fila, y solo se insertan las que se pudieron anotar (las ya
+# importadas, o repetidas en el mismo lote, chocan con la clave y se omiten).
+# Las que no traen identificador entran siempre.
+def _insertar_con_origen(tabla, columna_id, columnas, valores, select):
+    return f"""
+    WITH v AS (
+        SELECT v.*, nextval(pg_get_serial_sequence('{tabla}', '{columna_id}')) AS id
+        FROM (VALUES %s) AS v(identificador, {valores})
+        JOIN pacientes p ON p.dni_paciente = v.dni
+    ), anotadas AS (
+        INSERT INTO fhir_importados (identificador, tabla, id_registro)
+        SELECT identificador, '{tabla}', id FROM v WHERE identificador IS NOT NULL
+        ON CONFLICT (identificador) DO NOTHING
+        RETURNING id_registro
+    )
+    INSERT INTO {tabla} ({columna_id}, {columnas})
+    SELECT v.id, {select}
+    FROM v
+    WHERE v.identificador IS NULL OR v.id IN (SELECT id_registro FROM anotadas)
+    RETURNING 1
+    """
+
+
+registrar("fhir_insertar_consultas", _insertar_con_origen(
+    "consulta_medica", "id_consulta",
+    "id_paciente, id_medico, id_hospital, id_categoria, clasificacion, detalle_consulta, fecha_consulta",
+    "dni, id_medico, id_hospital, id_categoria, clasificacion, detalle, fecha",
+    "v.dni, v.id_medico::integer, v.id_hospital::integer, v.id_categoria::integer, "
+    "v.clasificacion::integer, v.detalle, v.fecha::date",
+), escritura=True)
+
+registrar("fhir_insertar_estudios", _insertar_con_origen(
+    "estudios_realizados", "id_estudio_realizado",
+    "dni_paciente, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones",
+    "dni, id_medico, id_hospital, id_categoria_estudio, id_estudio, fecha, observaciones",
+    "v.dni, v.id_medico::integer, v.id_hospital::integer, v.id_categoria_estudio::integer, "
+    "v.id_estudio::integer, v.fecha::date, v.observaciones",
+), escritura=True)
+
+registrar("fhir_insertar_recetas", _insertar_con_origen(
+    "medicamento_recetado", "id_medicamento_recetado",
+    "id_paciente, id_medico, id_medicamento, indicaciones, fecha_inicio_medicamento, fecha_terminacion_medicamento",
+    "dni, id_medico, id_medicamento, indicaciones, inicio, fin",
+    "v.dni, v.id_medico::integer, v.id_medicamento::integer, v.indicaciones, v.inicio::date, v.fin::date",
+), escritura=True)